@@ -1,22 +1,40 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 import os
-import io
+import json
+import threading
+import time
+import uuid
 
 # Set environment variable BEFORE importing transformers
 os.environ['TRANSFORMERS_NO_TF'] = '1'
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 
-import cv2
 import numpy as np
-from PIL import Image
 from textblob import TextBlob
 
 import torch
 from ultralytics import YOLO
 from transformers import CLIPProcessor, CLIPModel
 
+from services.batcher import MicroBatcher
+from services.clip_engine import ClipScorer
+from services.clip_lean import LeanClipModel, measure_drift, probe_images, probe_scores, resident_mb
+from services.embedding_index import EmbeddingIndex
+from services.inference_pool import InferencePool, PoolFullError
+from services.job_queue import JobQueue, JobQueueFull
+from services.profiling import RequestProfiler
+from services import metrics
+from services.result_cache import ResultCache, perceptual_hash
+from services.score_log import ScoreLog
+from services.text_embedding_cache import TextEmbeddingCache
+from services.text_triage import KeywordMatcher, LexiconUrgencyScorer
+from utils.image_io import decode_image, read_image_header, read_upload, UploadRejected, YOLO_MIN_LONG_SIDE
+
 # -------------------------------------------------
 # App Setup
 # -------------------------------------------------
@@ -31,22 +49,30 @@ CORS(app, origins=cors_origins)
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
-# -------------------------------------------------
-# Load Models
-# -------------------------------------------------
-print(f"Loading models on device: {device}")
-yolo_model = YOLO("yolov8n.pt")
-print("✓ YOLO model loaded")
+YOLO_WEIGHTS = "yolov8n.pt"
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
 
-clip_processor = CLIPProcessor.from_pretrained(
-    "openai/clip-vit-base-patch32"
-)
-print("✓ CLIP processor loaded")
+# torch (eager PyTorch) or onnx (ONNX Runtime on CPU)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_models")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "false").lower() == "true"
 
-clip_model = CLIPModel.from_pretrained(
-    "openai/clip-vit-base-patch32"
-).to(device)
-print("✓ CLIP model loaded")
+# Memory-lean CLIP (torch backend): fp32 | bf16 | fp16 weights, and the
+# text tower either resident or loaded on demand once the fixed prompts are
+# encoded. fp32 + resident loads the full CLIPModel as before.
+CLIP_PRECISION = os.getenv("CLIP_PRECISION", "fp32").lower()
+CLIP_TEXT_TOWER = os.getenv("CLIP_TEXT_TOWER", "resident").lower()
+CLIP_TEXT_IDLE_SECONDS = float(os.getenv("CLIP_TEXT_IDLE_SECONDS", 300))
+CLIP_DRIFT_CHECK = os.getenv("CLIP_DRIFT_CHECK", "true").lower() == "true"
+CLIP_LEAN = CLIP_PRECISION != "fp32" or CLIP_TEXT_TOWER == "on_demand"
+
+# Models are loaded by load_models() (see "Model Loading" below), normally
+# on a background thread once the server is accepting connections.
+yolo_model = None
+clip_processor = None
+clip_model = None
+clip_scorer = None
+clip_memory = {}   # resident memory / score drift of the lean CLIP mode
 
 # -------------------------------------------------
 # YOLO Junk Objects (hard reject if ANY present)
@@ -71,6 +97,40 @@ CIVIC_KEYWORDS = [
     "bridge", "sidewalk", "pavement", "manhole", "gutter"
 ]
 
+# -------------------------------------------------
+# Priority / Danger Keywords (TEXT TRIAGE)
+# -------------------------------------------------
+PRIORITY_KEYWORDS = {
+    "CRITICAL": ["fire", "smoke", "explosion", "electric", "spark", "gas"],
+    "HIGH": ["accident", "pothole", "flood", "crack", "leak"],
+    "MEDIUM": ["garbage", "waste", "sewage", "litter"],
+}
+
+DANGER_KEYWORDS = {
+    "fire": ["fire", "smoke", "explosion", "burning", "flame", "blaze"],
+    "electrical": ["electric", "spark", "wire", "cable", "transformer", "electrocute", "voltage"],
+    "electrical_danger": ["sparking", "exposed wire", "hanging wire", "broken wire", "live wire"],
+    "flood": ["flood", "flooding", "submerged", "water overflow", "severe water"],
+    "structural": ["collapse", "collapsing", "falling", "unstable building", "crack building"],
+}
+
+# Every keyword group above, matched in a single pass over the text
+text_matcher = KeywordMatcher({
+    "civic": CIVIC_KEYWORDS,
+    **{f"priority_{level}": words for level, words in PRIORITY_KEYWORDS.items()},
+    **{f"danger_{kind}": words for kind, words in DANGER_KEYWORDS.items()},
+})
+
+# textblob (default) or lexicon (same scores, ~8x faster, no TextBlob objects)
+URGENCY_SCORER = os.getenv("URGENCY_SCORER", "textblob").lower()
+lexicon_urgency_scorer = LexiconUrgencyScorer() if URGENCY_SCORER == "lexicon" else None
+
+
+def score_urgency(text):
+    if lexicon_urgency_scorer is not None:
+        return lexicon_urgency_scorer.score(text)
+    return abs(TextBlob(text).sentiment.polarity)
+
 # -------------------------------------------------
 # CLIP Civic Relevance Prompts
 # -------------------------------------------------
@@ -90,105 +150,571 @@ DESCRIPTION_MATCH_THRESHOLD = 0.20  # Image-description alignment
 CIVIC_IMAGE_THRESHOLD = 0.22        # Image must be civic-related
 CIVIC_VS_NONCIVIC_MARGIN = 0.05     # Civic score must exceed non-civic
 
+# -------------------------------------------------
+# Model Loading, Warm-up & Readiness
+# -------------------------------------------------
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+
+model_state = {
+    # not_loaded | loading | loaded (no warm-up yet) | warming_up | ready | failed
+    "status": "not_loaded",
+    "error": None,
+    "load_seconds": None,
+    "warmup_seconds": None,
+}
+_model_lock = threading.Lock()
+_process_started = time.time()
+
+
+def _load_model_weights():
+    global yolo_model, clip_processor, clip_model, clip_scorer, device, similarity_index, score_log
+    
+    clip_processor = CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+    print("✓ CLIP processor loaded")
+    
+    if INFERENCE_BACKEND == "onnx":
+        from services.onnx_backend import load_onnx_models
+        
+        device = "cpu"
+        print(f"Loading ONNX Runtime models (int8: {ONNX_QUANTIZE})")
+        yolo_model, clip_model = load_onnx_models(
+            ONNX_MODEL_DIR, YOLO_WEIGHTS, CLIP_MODEL_NAME, quantize=ONNX_QUANTIZE
+        )
+        print("✓ YOLO + CLIP ONNX models loaded")
+    else:
+        print(f"Loading models on device: {device}")
+        yolo_model = YOLO(YOLO_WEIGHTS)
+        print("✓ YOLO model loaded")
+        
+        clip_memory["rss_before_mb"] = resident_mb()
+        if CLIP_LEAN:
+            clip_model = LeanClipModel(
+                CLIP_MODEL_NAME,
+                device,
+                precision=CLIP_PRECISION,
+                text_on_demand=CLIP_TEXT_TOWER == "on_demand",
+                idle_seconds=CLIP_TEXT_IDLE_SECONDS
+            )
+            print(f"✓ CLIP towers loaded ({CLIP_PRECISION}, text tower {CLIP_TEXT_TOWER})")
+        else:
+            clip_model = CLIPModel.from_pretrained(CLIP_MODEL_NAME).to(device)
+            print("✓ CLIP model loaded")
+    
+    # Fixed prompts are encoded once here and reused for every request
+    clip_scorer = ClipScorer(
+        clip_model,
+        clip_processor,
+        device,
+        prompts=[CIVIC_CLIP_PROMPT, NON_CIVIC_PROMPT]
+    )
+    print("✓ CLIP prompt embeddings cached")
+    text_embedding_cache.clear()   # embeddings of a previous model
+    
+    drift_probe = None
+    if isinstance(clip_model, LeanClipModel):
+        drift_probe = _lean_clip_probe()   # needs the text tower
+        if clip_model.text_on_demand:
+            clip_model.release_text_tower()
+    if INFERENCE_BACKEND != "onnx":
+        # Before the drift check: its fp32 towers would inflate the reading
+        clip_memory["rss_after_mb"] = resident_mb()
+    if drift_probe is not None:
+        _check_clip_drift(*drift_probe)
+    
+    if EMBEDDING_INDEX_ENABLED:
+        similarity_index = EmbeddingIndex(
+            dim=clip_scorer.prompt_embeddings.shape[-1],
+            capacity=EMBEDDING_INDEX_CAPACITY,
+            path=EMBEDDING_INDEX_DIR or None,
+            geohash_precision=EMBEDDING_INDEX_GEOHASH_PRECISION
+        )
+        print(f"✓ Similar-report index opened ({similarity_index.stats()['entries']} embeddings)")
+    
+    if SCORE_LOG_ENABLED:
+        score_log = _open_score_log()
+        print(f"✓ Raw score log opened ({score_log.count} rows)")
+
+
+def _lean_clip_probe():
+    """(texts, images, lean scores) for the fp32 drift check, or None when off"""
+    if not CLIP_DRIFT_CHECK or CLIP_PRECISION == "fp32":
+        return None
+    texts = [CIVIC_CLIP_PROMPT, NON_CIVIC_PROMPT, "pothole on the road", "garbage dump near street"]
+    images = probe_images()
+    return texts, images, probe_scores(clip_scorer, texts, images)
+
+
+def _check_clip_drift(texts, images, lean_scores):
+    clip_memory["score_drift"] = measure_drift(
+        lean_scores, clip_processor, CLIP_MODEL_NAME, texts, images
+    )
+    print(f"✓ CLIP {CLIP_PRECISION} score drift vs fp32: {clip_memory['score_drift']}")
+
+
+def _warm_up_models():
+    """
+    One inference per model path on a dummy image, so lazy kernel and
+    allocator initialisation is paid here instead of by the first report.
+    Calls the batch functions directly to keep metrics clean.
+    """
+    dummy = np.full((480, 640, 3), 114, np.uint8)
+    _yolo_batch([dummy])
+    _yolo_lowres_batch([dummy])
+    clip_scorer.encode_images([dummy[..., ::-1]])
+    if not (isinstance(clip_model, LeanClipModel) and clip_model.text_on_demand):
+        clip_scorer.encode_texts(["pothole on the road"])
+    print("✓ Models warmed up")
+
+
+def load_models(warmup=MODEL_WARMUP):
+    """
+    Load (once) and optionally warm up every model, recording timings in
+    model_state. Safe to call repeatedly and from several threads: a
+    process that already holds the weights (e.g. a forked gunicorn worker)
+    only runs the warm-up.
+    """
+    with _model_lock:
+        if model_state["status"] == "ready":
+            return
+        try:
+            if clip_scorer is None:
+                model_state["status"] = "loading"
+                start = time.perf_counter()
+                _load_model_weights()
+                model_state["load_seconds"] = round(time.perf_counter() - start, 3)
+            
+            if warmup:
+                model_state["status"] = "warming_up"
+                start = time.perf_counter()
+                _warm_up_models()
+                model_state["warmup_seconds"] = round(time.perf_counter() - start, 3)
+                model_state["status"] = "ready"
+            else:
+                model_state["status"] = "loaded"
+        except Exception as e:
+            import traceback
+            model_state["status"] = "failed"
+            model_state["error"] = str(e)
+            print(f"Model loading failed: {e}")
+            print(traceback.format_exc())
+
+
+_loader_pid = None   # process that already started the loader thread
+_loader_start_lock = threading.Lock()
+
+
+def start_model_loading():
+    """
+    Load models on a background thread; returns immediately. Starts the
+    loader at most once per process (a forked worker starts its own, which
+    only runs the warm-up when the weights were preloaded).
+    """
+    global _loader_pid
+    with _loader_start_lock:
+        if _loader_pid == os.getpid():
+            return
+        _loader_pid = os.getpid()
+    threading.Thread(target=load_models, name="model-loader", daemon=True).start()
+
+
+@app.before_request
+def _ensure_model_loading():
+    # Servers without a startup hook (gunicorn app:app, flask run, waitress)
+    # start loading on the first request, e.g. the first readiness probe
+    if _loader_pid != os.getpid():
+        start_model_loading()
+
+
+def models_ready():
+    status = model_state["status"]
+    return status == "ready" or (status == "loaded" and not MODEL_WARMUP)
+
+
+def models_not_ready_response_body():
+    return {
+        "status": "error",
+        "message": f"AI models are not ready yet ({model_state['status']})"
+    }
+
+# -------------------------------------------------
+# Inference Micro-Batching
+# -------------------------------------------------
+# Concurrent /analyze requests are grouped into one batched forward pass.
+# INFERENCE_MAX_BATCH=1 disables batching (inline batch-size-1 inference).
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", 8))
+INFERENCE_BATCH_WAIT_MS = float(os.getenv("INFERENCE_BATCH_WAIT_MS", 10))
+
+
+# Low-resolution first YOLO pass (see validation cascade below)
+YOLO_CASCADE = os.getenv("YOLO_CASCADE", "true").lower() == "true"
+YOLO_LOWRES_IMGSZ = int(os.getenv("YOLO_LOWRES_IMGSZ", 320))
+YOLO_LOWRES_MIN_CONF = float(os.getenv("YOLO_LOWRES_MIN_CONF", 0.10))
+YOLO_CONF = 0.25   # ultralytics default, used by the full-resolution pass
+
+# Both passes share one ultralytics model, whose predict() rewrites the
+# shared predictor.args (imgsz, conf) outside ultralytics' own lock: two
+# concurrent calls would each run with the other's settings.
+_yolo_lock = threading.Lock()
+
+
+def _yolo_batch(cv_images):
+    with _yolo_lock:
+        results = yolo_model(cv_images, verbose=False)
+    return [
+        {yolo_model.names[int(cls)] for cls in result.boxes.cls}
+        for result in results
+    ]
+
+
+def _yolo_lowres_batch(cv_images):
+    """Returns {class_name: best_confidence} per image"""
+    with _yolo_lock:
+        results = yolo_model(
+            cv_images, imgsz=YOLO_LOWRES_IMGSZ, conf=YOLO_LOWRES_MIN_CONF, verbose=False
+        )
+    detections = []
+    for result in results:
+        best = {}
+        for cls, conf in zip(result.boxes.cls.tolist(), result.boxes.conf.tolist()):
+            name = yolo_model.names[int(cls)]
+            best[name] = max(conf, best.get(name, 0.0))
+        detections.append(best)
+    return detections
+
+
+def _clip_image_batch(images):
+    return list(clip_scorer.encode_images(images))
+
+
+def _clip_text_batch(texts):
+    return list(clip_scorer.encode_texts(texts))
+
+
+yolo_batcher = MicroBatcher(
+    "yolo", _yolo_batch, INFERENCE_MAX_BATCH, INFERENCE_BATCH_WAIT_MS
+)
+yolo_lowres_batcher = MicroBatcher(
+    "yolo_lowres", _yolo_lowres_batch, INFERENCE_MAX_BATCH, INFERENCE_BATCH_WAIT_MS
+)
+clip_image_batcher = MicroBatcher(
+    "clip_image", _clip_image_batch, INFERENCE_MAX_BATCH, INFERENCE_BATCH_WAIT_MS
+)
+clip_text_batcher = MicroBatcher(
+    "clip_text", _clip_text_batch, INFERENCE_MAX_BATCH, INFERENCE_BATCH_WAIT_MS
+)
+
+# Decode uploads at reduced resolution (JPEG DCT scaling) when the file is
+# much larger than the models need. false = full-resolution decode.
+IMAGE_DECODE_DOWNSCALE = os.getenv("IMAGE_DECODE_DOWNSCALE", "true").lower() == "true"
+
+# Upload limits, enforced while the upload is read in chunks: format and
+# dimensions are sniffed from the header before the rest is read.
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", 40_000_000))
+UPLOAD_FORMATS = {
+    f.strip().upper()
+    for f in os.getenv("UPLOAD_FORMATS", "JPEG,MPO,PNG,WEBP,BMP").split(",")
+    if f.strip()
+}
+UPLOAD_FORM_OVERHEAD = 64 * 1024   # multipart boundaries + text fields
+# Image uploads an endpoint's request may carry, where more than one
+UPLOAD_FILES_PER_REQUEST = {}
+
+
+def upload_request_limit(max_files=1):
+    """Largest request body accepted for `max_files` images (None = no limit)"""
+    if not UPLOAD_MAX_BYTES:
+        return None
+    return UPLOAD_MAX_BYTES * max_files + UPLOAD_FORM_OVERHEAD
+
+
+class UploadLimitedRequest(Request):
+    """
+    Werkzeug enforces max_content_length while reading the body, so it
+    also caps chunked uploads that have no Content-Length. The limit is
+    MAX_CONTENT_LENGTH, raised for endpoints in UPLOAD_FILES_PER_REQUEST.
+    """
+
+    @property
+    def max_content_length(self):
+        max_files = UPLOAD_FILES_PER_REQUEST.get(self.endpoint)
+        if max_files is None:
+            return super().max_content_length
+        return upload_request_limit(max_files)
+
+
+app.request_class = UploadLimitedRequest
+app.config["MAX_CONTENT_LENGTH"] = upload_request_limit()
+
+
+def read_image_upload(image_file):
+    """Bounded read of an uploaded image; raises UploadRejected"""
+    return read_upload(image_file.stream, UPLOAD_MAX_BYTES, UPLOAD_MAX_PIXELS, UPLOAD_FORMATS)
+
+
+def request_too_large(max_files=1):
+    """Content-Length check before the multipart body is parsed"""
+    limit = upload_request_limit(max_files)
+    return bool(limit and request.content_length and request.content_length > limit)
+
+
+def upload_too_large_response():
+    return jsonify(upload_rejected_response_body(UploadRejected(
+        "upload_too_large",
+        f"Image file is too large (max {UPLOAD_MAX_BYTES // (1024 * 1024)} MB)"
+    ))), 413
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_entity_too_large(e):
+    return upload_too_large_response()
+
+
+def upload_rejected_response_body(error):
+    metrics.rejections.inc(reason=error.reason_code)
+    return {
+        "status": "rejected",
+        "message": error.message,
+        "is_fake": True,
+        "debug": {"reason": error.reason_code}
+    }
+
 # -------------------------------------------------
 # YOLO Detection
 # -------------------------------------------------
 def detected_objects_from_image(cv_image):
     """Detect objects in image using YOLO"""
     try:
-        results = yolo_model(cv_image, verbose=False)
-        detected = {
-            yolo_model.names[int(cls)]
-            for cls in results[0].boxes.cls
-        }
-        return detected
+        with metrics.stage_seconds.time(stage="yolo"):
+            return yolo_batcher.run(cv_image)
     except Exception as e:
         print(f"YOLO detection error: {e}")
         return set()
 
+
+def detect_junk_objects_cascaded(cv_image):
+    """
+    Cheap low-resolution YOLO pass first; escalate to the full-resolution
+    pass only when the result is ambiguous.
+    - junk seen with confidence >= YOLO_CONF at low res: confident reject
+    - junk candidates only below YOLO_CONF: ambiguous, re-run at full res
+    - no junk candidates at all: accept the low-res result
+    Returns (detected_objects, escalated).
+    """
+    try:
+        with metrics.stage_seconds.time(stage="yolo_lowres"):
+            candidates = yolo_lowres_batcher.run(cv_image)
+    except Exception as e:
+        print(f"YOLO low-res detection error: {e}")
+        return detected_objects_from_image(cv_image), True
+    
+    detected, ambiguous = resolve_lowres_detections(candidates)
+    if not ambiguous:
+        return detected, False
+    return detected_objects_from_image(cv_image), True
+
+
+def resolve_lowres_detections(candidates):
+    """
+    Low-res {class_name: confidence} -> (detected_objects, ambiguous);
+    ambiguous results need the full-resolution pass.
+    """
+    detected = {name for name, conf in candidates.items() if conf >= YOLO_CONF}
+    junk_candidates = set(candidates) & JUNK_OBJECTS
+    return detected, not (detected & JUNK_OBJECTS or not junk_candidates)
+
 # -------------------------------------------------
 # FIXED CLIP Similarity Calculation
 # -------------------------------------------------
+def _timed_future(future, stage):
+    """Record submit-to-result latency of a batched pass as a stage metric"""
+    start = time.perf_counter()
+    future.add_done_callback(
+        lambda _: metrics.stage_seconds.observe(time.perf_counter() - start, stage=stage)
+    )
+    return future
+
+
+def encode_description(text):
+    """
+    Future of the CLIP embedding of a user description. Repeated
+    descriptions (after case/whitespace normalization) come from the text
+    embedding cache, so they cost no text-tower pass.
+    """
+    key = text_embedding_cache.key(text)
+    cached = text_embedding_cache.get(key) if text_embedding_cache.enabled else None
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
+    
+    # Encode the normalized form so cached and fresh embeddings are identical
+    future = _timed_future(clip_text_batcher.submit(key), "clip_text")
+    
+    def remember(done):
+        if done.exception() is None:
+            text_embedding_cache.put(key, done.result())
+    
+    future.add_done_callback(remember)
+    return future
+
+
+def encode_descriptions(texts):
+    """Batched encode_description for bulk callers: one pass for all misses"""
+    keys = [text_embedding_cache.key(text) for text in texts]
+    embeddings = [
+        text_embedding_cache.get(key) if text_embedding_cache.enabled else None
+        for key in keys
+    ]
+    missing = list(dict.fromkeys(k for k, e in zip(keys, embeddings) if e is None))
+    if missing:
+        encoded = dict(zip(missing, clip_scorer.encode_texts(missing)))
+        for key, embedding in encoded.items():
+            text_embedding_cache.put(key, embedding)
+        embeddings = [e if e is not None else encoded[k] for k, e in zip(keys, embeddings)]
+    return embeddings
+
+
+def calculate_clip_scores(image, text, return_embedding=False):
+    """
+    Encode the image ONCE and score it against the description and both
+    cached civic prompts with a single matrix product.
+    Returns (desc_similarity, civic_similarity, noncivic_similarity),
+    each a cosine similarity in [-1, 1], followed by the image embedding
+    when `return_embedding` is set.
+    """
+    try:
+        image_future = _timed_future(clip_image_batcher.submit(image), "clip_image")
+        text_future = encode_description(text)
+        image_embedding, text_embedding = image_future.result(), text_future.result()
+        with metrics.stage_seconds.time(stage="clip_score"):
+            desc_similarity, prompt_scores = clip_scorer.score(
+                image_embedding, text_embedding
+            )
+        scores = (
+            desc_similarity,
+            prompt_scores[CIVIC_CLIP_PROMPT],
+            prompt_scores[NON_CIVIC_PROMPT]
+        )
+        return scores + (image_embedding,) if return_embedding else scores
+    except Exception as e:
+        print(f"CLIP similarity error: {e}")
+        return (0.0, 0.0, 0.0, None) if return_embedding else (0.0, 0.0, 0.0)
+
+
 def calculate_clip_similarity(image, text):
     """
-    CORRECTED: Calculate cosine similarity between image and text
+    Calculate cosine similarity between image and a single text
     Returns value in range [-1, 1], typically [0, 1] for similar content
     """
     try:
-        inputs = clip_processor(
-            text=[text],
-            images=image,
-            return_tensors="pt",
-            padding=True
-        ).to(device)
-        
-        with torch.no_grad():
-            # Get normalized features
-            image_features = clip_model.get_image_features(
-                pixel_values=inputs['pixel_values']
-            )
-            text_features = clip_model.get_text_features(
-                input_ids=inputs['input_ids'],
-                attention_mask=inputs['attention_mask']
-            )
-            
-            # Normalize features
-            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-            text_features = text_features / text_features.norm(dim=-1, keepdim=True)
-            
-            # Cosine similarity
-            similarity = (image_features @ text_features.T).squeeze().item()
-        
-        return similarity
+        image_embedding = clip_image_batcher.run(image)
+        text_embedding = encode_description(text).result()
+        return (image_embedding @ text_embedding).item()
     except Exception as e:
         print(f"CLIP similarity error: {e}")
         return 0.0
 
 # -------------------------------------------------
-# FINAL IMAGE + TEXT VALIDATION PIPELINE
+# FINAL IMAGE + TEXT VALIDATION PIPELINE (cost-ordered cascade)
 # -------------------------------------------------
-def validate_image_and_text(image_bytes, text):
+class ValidationContext:
     """
-    ENFORCED ORDER (FIXED):
-    1. Image ↔ description match (CORRECTED CLIP)
-    2. Image is civic-related (CORRECTED CLIP with contrast)
-    3. Description contains civic keywords
+    State shared by the cascade stages for one submission.
+    Signals computed ahead of time (bulk re-scoring runs YOLO/CLIP over
+    whole batches) can be set before the cascade runs; the stages only
+    compute what is still missing.
     """
     
-    # Decode image
-    np_img = np.frombuffer(image_bytes, np.uint8)
-    cv_image = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
+    def __init__(self, image_bytes, text, hits=None, decoded=None):
+        self.image_bytes = image_bytes
+        self.text = text.strip()
+        self.hits = hits if hits is not None else text_matcher.scan(self.text)
+        self._decoded = decoded
+        self._decode_attempted = decoded is not None or image_bytes is None
+        self.detected = None
+        self.yolo_escalated = False
+        self.found_keywords = []
+        self.desc_similarity = None
+        self.civic_similarity = None
+        self.noncivic_similarity = None
+        self.image_embedding = None
+        self.rejection_code = None
     
-    if cv_image is None:
-        return False, "Invalid image file", {}
+    @property
+    def decoded(self):
+        """Image decoded ONCE on first use; YOLO and CLIP share this buffer"""
+        if not self._decode_attempted:
+            self._decode_attempted = True
+            with metrics.stage_seconds.time(stage="decode"):
+                self._decoded = decode_image(
+                    self.image_bytes,
+                    min_long_side=YOLO_MIN_LONG_SIDE if IMAGE_DECODE_DOWNSCALE else 0
+                )
+        return self._decoded
     
-    text = text.strip()
-    if not text:
-        return False, "Description cannot be empty", {}
+    @property
+    def decode_attempted(self):
+        return self._decode_attempted
+
+
+# Each stage returns None to pass, or (reason_code, reason, debug_info) to
+# reject; reason_code labels the rejection metric.
+def _stage_text_present(ctx):
+    if not ctx.text:
+        return "empty_description", "Description cannot be empty", {}
+
+
+def _stage_civic_keywords(ctx):
+    ctx.found_keywords = ctx.hits.group("civic")
     
-    text_lower = text.lower()
+    if not ctx.found_keywords:
+        return "no_civic_keywords", (
+            "Description does not contain civic-related keywords. "
+            f"Please mention specific issues like: {', '.join(CIVIC_KEYWORDS[:8])}, etc."
+        ), {"civic_keywords_found": []}
+
+
+def _stage_image_valid(ctx):
+    if ctx.decoded is None:
+        return "invalid_image", "Invalid image file", {}
+
+
+def _stage_yolo_junk(ctx):
+    if ctx.decoded is None:
+        return _stage_image_valid(ctx)
     
-    # -------------------------------------------------
-    # STEP 0: YOLO – reject if ANY junk objects detected
-    # -------------------------------------------------
-    detected = detected_objects_from_image(cv_image)
-    junk_found = detected & JUNK_OBJECTS
+    if ctx.detected is None:
+        if YOLO_CASCADE:
+            ctx.detected, ctx.yolo_escalated = detect_junk_objects_cascaded(ctx.decoded.bgr)
+        else:
+            ctx.detected = detected_objects_from_image(ctx.decoded.bgr)
+    junk_found = ctx.detected & JUNK_OBJECTS
     
     if junk_found:
-        return False, (
+        return "junk_objects", (
             f"Image contains non-civic objects: {', '.join(junk_found)}. "
             "Please upload an image related to a civic issue."
-        ), {"detected_objects": list(detected)}
-    
-    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        ), {"detected_objects": list(ctx.detected)}
+
+
+def _stage_clip(ctx):
+    if ctx.decoded is None:
+        return _stage_image_valid(ctx)
     
-    # -------------------------------------------------
-    # STEP 1: Image ↔ Description match (FIXED CLIP)
-    # -------------------------------------------------
-    desc_similarity = calculate_clip_similarity(image, text)
+    # One vision pass; description + cached prompts scored together
+    if ctx.desc_similarity is None:
+        (ctx.desc_similarity, ctx.civic_similarity, ctx.noncivic_similarity,
+         ctx.image_embedding) = calculate_clip_scores(
+            ctx.decoded.rgb, ctx.text, return_embedding=True
+        )
+    desc_similarity = ctx.desc_similarity
+    civic_similarity = ctx.civic_similarity
+    noncivic_similarity = ctx.noncivic_similarity
     
+    # Image ↔ Description match
     if desc_similarity < DESCRIPTION_MATCH_THRESHOLD:
-        return False, (
+        return "description_mismatch", (
             f"Image and description do not match "
             f"(similarity: {round(desc_similarity, 3)})"
         ), {
@@ -196,15 +722,9 @@ def validate_image_and_text(image_bytes, text):
             "threshold": DESCRIPTION_MATCH_THRESHOLD
         }
     
-    # -------------------------------------------------
-    # STEP 2: Image must be CIVIC (FIXED CLIP with contrast)
-    # -------------------------------------------------
-    civic_similarity = calculate_clip_similarity(image, CIVIC_CLIP_PROMPT)
-    noncivic_similarity = calculate_clip_similarity(image, NON_CIVIC_PROMPT)
-    
-    # Image must score higher on civic than non-civic
+    # Image must be CIVIC, and score higher on civic than non-civic
     if civic_similarity < CIVIC_IMAGE_THRESHOLD:
-        return False, (
+        return "not_civic", (
             f"Image does not appear to be civic-related "
             f"(civic score: {round(civic_similarity, 3)})"
         ), {
@@ -214,7 +734,7 @@ def validate_image_and_text(image_bytes, text):
         }
     
     if civic_similarity < noncivic_similarity + CIVIC_VS_NONCIVIC_MARGIN:
-        return False, (
+        return "more_non_civic", (
             f"Image appears more non-civic than civic "
             f"(civic: {round(civic_similarity, 3)}, "
             f"non-civic: {round(noncivic_similarity, 3)})"
@@ -222,38 +742,75 @@ def validate_image_and_text(image_bytes, text):
             "civic_score": round(civic_similarity, 3),
             "non_civic_score": round(noncivic_similarity, 3)
         }
-    
-    # -------------------------------------------------
-    # STEP 3: Description must contain civic keywords
-    # -------------------------------------------------
-    found_keywords = [k for k in CIVIC_KEYWORDS if k in text_lower]
-    
-    if not found_keywords:
-        return False, (
-            "Description does not contain civic-related keywords. "
-            f"Please mention specific issues like: {', '.join(CIVIC_KEYWORDS[:8])}, etc."
-        ), {"civic_keywords_found": []}
+
+
+ValidationStage = namedtuple("ValidationStage", ["name", "cost", "run"])
+
+# Relative cost estimates (≈ CPU ms per report); stages run cheapest-first.
+# Override with e.g. VALIDATION_STAGE_COSTS="yolo_junk=80,clip=60".
+DEFAULT_VALIDATION_STAGES = [
+    ValidationStage("text_present", 0.001, _stage_text_present),
+    ValidationStage("civic_keywords", 0.01, _stage_civic_keywords),
+    ValidationStage("image_valid", 5, _stage_image_valid),
+    ValidationStage("yolo_junk", 40, _stage_yolo_junk),
+    ValidationStage("clip", 120, _stage_clip),
+]
+
+
+def build_validation_cascade(stages, cost_overrides=""):
+    costs = {}
+    for item in filter(None, (part.strip() for part in cost_overrides.split(","))):
+        name, _, cost = item.partition("=")
+        costs[name.strip()] = float(cost)
+    stages = [stage._replace(cost=costs.get(stage.name, stage.cost)) for stage in stages]
+    return sorted(stages, key=lambda stage: stage.cost)
+
+
+VALIDATION_CASCADE = build_validation_cascade(
+    DEFAULT_VALIDATION_STAGES, os.getenv("VALIDATION_STAGE_COSTS", "")
+)
+
+
+def validate_image_and_text(image_bytes, text, hits=None):
+    """
+    Runs VALIDATION_CASCADE cheapest-first and stops at the first stage
+    that rejects, so spam text never pays for YOLO or CLIP:
+    1. Description is present and contains civic keywords
+    2. Image decodes
+    3. YOLO – no junk objects (low-res pass, full res only if ambiguous)
+    4. CLIP – image ↔ description match, image is civic (with contrast)
+    `hits` is an optional precomputed text_matcher.scan(text).
+    """
+    return run_validation_cascade(ValidationContext(image_bytes, text, hits))
+
+
+def run_validation_cascade(ctx):
+    """validate_image_and_text on a caller-held ValidationContext"""
+    for stage in VALIDATION_CASCADE:
+        rejection = stage.run(ctx)
+        if rejection is not None:
+            reason_code, reason, debug_info = rejection
+            ctx.rejection_code = reason_code
+            metrics.rejections.inc(reason=reason_code)
+            return False, reason, debug_info
     
     return True, "Validated civic issue", {
-        "description_match_score": round(desc_similarity, 3),
-        "civic_score": round(civic_similarity, 3),
-        "non_civic_score": round(noncivic_similarity, 3),
-        "keywords_found": found_keywords,
-        "detected_objects": list(detected) if detected else []
+        "description_match_score": round(ctx.desc_similarity, 3),
+        "civic_score": round(ctx.civic_similarity, 3),
+        "non_civic_score": round(ctx.noncivic_similarity, 3),
+        "keywords_found": ctx.found_keywords,
+        "detected_objects": list(ctx.detected) if ctx.detected else []
     }
 
 # -------------------------------------------------
 # Priority Logic (text-based)
 # -------------------------------------------------
-def decide_priority(text):
+def decide_priority(text, hits=None):
     """Determine priority based on keywords in text"""
-    text = text.lower()
-    if any(w in text for w in ["fire", "smoke", "explosion", "electric", "spark", "gas"]):
-        return "CRITICAL"
-    if any(w in text for w in ["accident", "pothole", "flood", "crack", "leak"]):
-        return "HIGH"
-    if any(w in text for w in ["garbage", "waste", "sewage", "litter"]):
-        return "MEDIUM"
+    hits = hits if hits is not None else text_matcher.scan(text)
+    for level in ("CRITICAL", "HIGH", "MEDIUM"):
+        if hits.any(f"priority_{level}"):
+            return level
     return "LOW"
 
 # -------------------------------------------------
@@ -284,37 +841,32 @@ def calculate_verification_score(desc_similarity, civic_similarity, keywords_fou
 # -------------------------------------------------
 # Dangerous Content Detection
 # -------------------------------------------------
-def detect_dangerous_content(text, civic_similarity, keywords_found):
+def detect_dangerous_content(text, civic_similarity, keywords_found, hits=None):
     """
     Detect dangerous/critical content that requires immediate attention
     Returns: (is_dangerous: bool, danger_type: str|None)
     """
-    text_lower = text.lower()
+    hits = hits if hits is not None else text_matcher.scan(text)
     
     # Fire/Explosion hazards
-    fire_keywords = ["fire", "smoke", "explosion", "burning", "flame", "blaze"]
-    if any(k in text_lower for k in fire_keywords):
+    if hits.any("danger_fire"):
         # Verify with civic similarity (should be high for real fire)
         if civic_similarity >= 0.25:
             return True, "fire"
     
     # Electrical hazards
-    electrical_keywords = ["electric", "spark", "wire", "cable", "transformer", "electrocute", "voltage"]
-    danger_electrical = ["sparking", "exposed wire", "hanging wire", "broken wire", "live wire"]
-    if any(k in text_lower for k in electrical_keywords):
+    if hits.any("danger_electrical"):
         # Check for danger indicators
-        if any(d in text_lower for d in danger_electrical) or civic_similarity >= 0.28:
+        if hits.any("danger_electrical_danger") or civic_similarity >= 0.28:
             return True, "electrical"
     
     # Severe flooding
-    flood_keywords = ["flood", "flooding", "submerged", "water overflow", "severe water"]
-    if any(k in text_lower for k in flood_keywords):
+    if hits.any("danger_flood"):
         if civic_similarity >= 0.25:
             return True, "flood"
     
     # Structural hazards
-    structural_keywords = ["collapse", "collapsing", "falling", "unstable building", "crack building"]
-    if any(k in text_lower for k in structural_keywords):
+    if hits.any("danger_structural"):
         if civic_similarity >= 0.26:
             return True, "structural"
     
@@ -330,87 +882,554 @@ def health():
         "status": "success",
         "message": "CivicAudit AI (FIXED 3-STEP VALIDATION) running",
         "device": device,
+        "inference_backend": INFERENCE_BACKEND,
         "models_loaded": {
-            "yolo": "yolov8n.pt",
-            "clip": "openai/clip-vit-base-patch32"
-        }
+            "yolo": YOLO_WEIGHTS,
+            "clip": CLIP_MODEL_NAME
+        },
+        "models": model_state,
+        "ready": models_ready(),
+        "clip_memory": dict(
+            clip_memory,
+            **(clip_model.stats() if isinstance(clip_model, LeanClipModel) else {"precision": "fp32"})
+        ),
+        "inference_batching": {
+            "yolo": yolo_batcher.stats(),
+            "yolo_lowres": yolo_lowres_batcher.stats(),
+            "clip_image": clip_image_batcher.stats(),
+            "clip_text": clip_text_batcher.stats()
+        },
+        "result_cache": result_cache.stats(),
+        "text_embedding_cache": text_embedding_cache.stats(),
+        "inference_pool": inference_pool.stats(),
+        "analysis_jobs": analysis_jobs.stats(),
+        "profiling": request_profiler.stats(),
+        "similarity_index": similarity_index.stats() if similarity_index is not None else None,
+        "score_log": score_log.stats() if score_log is not None else None
+    })
+
+@app.route("/health/live", methods=["GET"])
+def liveness():
+    """Process is up and serving HTTP (models may still be loading)"""
+    return jsonify({
+        "status": "alive",
+        "uptime_seconds": round(time.time() - _process_started, 1)
     })
 
+
+@app.route("/health/ready", methods=["GET"])
+def readiness():
+    """200 only once models are loaded and warmed up; 503 before that"""
+    ready = models_ready()
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "models": model_state,
+        "uptime_seconds": round(time.time() - _process_started, 1)
+    }), 200 if ready else 503
+
+# -------------------------------------------------
+# Analysis Result Cache
+# -------------------------------------------------
+# Resubmitted photos (retries, reposts, re-encoded JPEGs) are answered
+# from here without running any model. RESULT_CACHE_SIZE=0 disables it.
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", 1024)),
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", 3600)),
+    use_phash=os.getenv("RESULT_CACHE_PHASH", "true").lower() == "true",
+    phash_distance=int(os.getenv("RESULT_CACHE_PHASH_DISTANCE", 4))
+)
+
+# -------------------------------------------------
+# CLIP Text Embedding Cache
+# -------------------------------------------------
+# Descriptions repeat a lot ("pothole on the road"); a repeated one only
+# costs the image encoding. CLIP_TEXT_CACHE_SIZE=0 disables it.
+text_embedding_cache = TextEmbeddingCache(
+    max_entries=int(os.getenv("CLIP_TEXT_CACHE_SIZE", 4096)),
+    max_bytes=int(float(os.getenv("CLIP_TEXT_CACHE_MAX_MB", 16)) * 1024 * 1024)
+)
+
+# -------------------------------------------------
+# Similar-Report Index (near-duplicate detection)
+# -------------------------------------------------
+# The CLIP image embedding of every accepted report is kept (float16,
+# memory-mapped under EMBEDDING_INDEX_DIR) so /similar can find earlier
+# reports of the same problem. EMBEDDING_INDEX_DIR="" keeps it in memory.
+EMBEDDING_INDEX_ENABLED = os.getenv("EMBEDDING_INDEX", "true").lower() == "true"
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", "embedding_index")
+EMBEDDING_INDEX_CAPACITY = int(os.getenv("EMBEDDING_INDEX_CAPACITY", 100000))
+EMBEDDING_INDEX_GEOHASH_PRECISION = int(os.getenv("EMBEDDING_INDEX_GEOHASH_PRECISION", 6))
+SIMILAR_DEFAULT_RADIUS_M = float(os.getenv("SIMILAR_DEFAULT_RADIUS_M", 500))
+SIMILAR_MAX_AGE_HOURS = float(os.getenv("SIMILAR_MAX_AGE_HOURS", 720))
+
+similarity_index = None   # opened by load_models()
+
+
+def parse_report_location(form):
+    """Optional latitude/longitude form fields -> (lat, lon) or None"""
+    latitude, longitude = form.get("latitude"), form.get("longitude")
+    if latitude in (None, "") and longitude in (None, ""):
+        return None
+    try:
+        lat, lon = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must both be numbers")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("latitude/longitude out of range")
+    return lat, lon
+
+
+def index_report_embedding(image_embedding, report_id=None, location=None):
+    """Remember an accepted report's image; returns its index id (or None)"""
+    if similarity_index is None or image_embedding is None:
+        return None
+    item_id = report_id or uuid.uuid4().hex
+    lat, lon = location or (None, None)
+    try:
+        with metrics.stage_seconds.time(stage="similar_index_add"):
+            similarity_index.add(
+                item_id, image_embedding.float().cpu().numpy(), lat, lon
+            )
+    except ValueError as e:
+        print(f"Similar-report index: skipped {item_id!r}: {e}")
+        return None
+    return item_id
+
+# -------------------------------------------------
+# Raw Score Log (threshold recalibration)
+# -------------------------------------------------
+# With SCORE_LOG=true every analysed report gets ALL raw signals computed
+# (the cascade normally stops at the first rejection) and appended to a
+# memory-mapped columnar log; replay_thresholds.py re-evaluates any
+# threshold set against it without running a model. Costs a full YOLO +
+# CLIP pass even for reports rejected on text alone.
+SCORE_LOG_ENABLED = os.getenv("SCORE_LOG", "false").lower() == "true"
+SCORE_LOG_DIR = os.getenv("SCORE_LOG_DIR", "score_log")
+
+REASON_CODES = [
+    "accepted", "empty_description", "no_civic_keywords", "invalid_image",
+    "junk_objects", "description_mismatch", "not_civic", "more_non_civic"
+]
+
+score_log = None   # opened by load_models()
+_score_log_classes = {}
+
+
+def _open_score_log():
+    class_names = [yolo_model.names[i] for i in sorted(yolo_model.names)]
+    _score_log_classes.update((name, i) for i, name in enumerate(class_names))
+    return ScoreLog(SCORE_LOG_DIR, columns={
+        "timestamp": ("<f8", ()),
+        "has_text": ("u1", ()),
+        "image_valid": ("u1", ()),
+        "civic_keywords": ("u1", ()),
+        "keyword_groups": ("<u8", ()),
+        "desc_similarity": ("<f4", ()),
+        "civic_similarity": ("<f4", ()),
+        "noncivic_similarity": ("<f4", ()),
+        "yolo_classes": ("<u8", ((len(class_names) + 63) // 64,)),
+        "yolo_escalated": ("u1", ()),
+        "reason": ("u1", ()),
+        "verification_score": ("i1", ()),   # -1 when rejected
+    }, metadata={
+        "reasons": REASON_CODES,
+        "keyword_groups": list(text_matcher.groups),
+        "yolo_classes": class_names,
+        "junk_objects": sorted(JUNK_OBJECTS),
+        "stage_order": [stage.name for stage in VALIDATION_CASCADE],
+        "thresholds": {
+            "DESCRIPTION_MATCH_THRESHOLD": DESCRIPTION_MATCH_THRESHOLD,
+            "CIVIC_IMAGE_THRESHOLD": CIVIC_IMAGE_THRESHOLD,
+            "CIVIC_VS_NONCIVIC_MARGIN": CIVIC_VS_NONCIVIC_MARGIN
+        },
+        "models": {"backend": INFERENCE_BACKEND, "yolo": YOLO_WEIGHTS, "clip": CLIP_MODEL_NAME}
+    })
+
+
+def log_raw_scores(ctx, verification_score=None):
+    """Compute every signal the cascade skipped, then append one score-log row"""
+    if score_log is None:
+        return
+    try:
+        with metrics.stage_seconds.time(stage="score_log"):
+            # Stages only compute what is missing; their verdicts are ignored
+            for stage in VALIDATION_CASCADE:
+                stage.run(ctx)
+            
+            yolo_classes = np.zeros(score_log.columns["yolo_classes"][1], np.uint64)
+            for name in ctx.detected or ():
+                index = _score_log_classes.get(name)
+                if index is not None:
+                    yolo_classes[index // 64] |= np.uint64(1 << (index % 64))
+            nan = float("nan")
+            score_log.append({
+                "timestamp": time.time(),
+                "has_text": bool(ctx.text),
+                "image_valid": ctx.decoded is not None,
+                "civic_keywords": min(255, len(ctx.hits.group("civic"))),
+                "keyword_groups": sum(
+                    1 << i for i, group in enumerate(text_matcher.groups) if ctx.hits.any(group)
+                ),
+                "desc_similarity": nan if ctx.desc_similarity is None else ctx.desc_similarity,
+                "civic_similarity": nan if ctx.civic_similarity is None else ctx.civic_similarity,
+                "noncivic_similarity": nan if ctx.noncivic_similarity is None else ctx.noncivic_similarity,
+                "yolo_classes": yolo_classes,
+                "yolo_escalated": ctx.yolo_escalated,
+                "reason": REASON_CODES.index(ctx.rejection_code or "accepted"),
+                "verification_score": -1 if verification_score is None else verification_score
+            })
+    except Exception as e:
+        print(f"Score log error: {e}")
+
+# -------------------------------------------------
+# Full Analysis (validation + triage)
+# -------------------------------------------------
+def analyze_report(image_bytes, text, urgency=None, location=None, report_id=None):
+    """
+    Analyze one report, answering from the result cache when the same
+    image + description was seen recently. Cache hits are still added to
+    the similar-report index, under their own report_id / location.
+    Returns (response_body, http_status).
+    """
+    if not result_cache.enabled:
+        return run_analysis(image_bytes, text, urgency, location, report_id)
+    
+    key, norm_text = result_cache.make_key(image_bytes, text)
+    ctx = new_validation_context(image_bytes, text)
+    # The near-duplicate lookup hashes the decode the analysis reuses
+    cached = result_cache.get(key, norm_text, lambda: image_phash(ctx))
+    if cached is not None:
+        body, status_code, image_embedding = cached
+        body["cached"] = True
+        if status_code == 200:
+            body["analysis"]["similarity_index_id"] = index_report_embedding(
+                image_embedding, report_id, location
+            )
+        return body, status_code
+    
+    body, status_code = analyze_context(ctx, text, urgency, location, report_id)
+    # Keep the image embedding so a hit can be indexed like a fresh report
+    image_embedding = ctx.image_embedding if status_code == 200 else None
+    if image_embedding is not None:
+        image_embedding = image_embedding.detach().float().cpu()
+    # Reports rejected on their text alone were never decoded: exact key only
+    phash = image_phash(ctx) if result_cache.use_phash and ctx.decode_attempted else None
+    result_cache.put(key, norm_text, (body, status_code, image_embedding), phash)
+    return body, status_code
+
+
+def image_phash(ctx):
+    """Perceptual hash of the submission's shared decode (None if undecodable)"""
+    if ctx.decoded is None:
+        return None
+    return perceptual_hash(ctx.decoded.bgr)
+
+
+def new_validation_context(image_bytes, text):
+    # One keyword pass shared by validation, priority and danger detection
+    with metrics.stage_seconds.time(stage="keywords"):
+        hits = text_matcher.scan(text)
+    return ValidationContext(image_bytes, text, hits)
+
+
+def run_analysis(image_bytes, text, urgency=None, location=None, report_id=None):
+    """
+    Run validation, triage, scoring and danger detection for one report.
+    `urgency` may be precomputed (batch mode scores all texts at once).
+    Accepted reports are added to the similar-report index under
+    `report_id` (generated when omitted) at `location` (lat, lon).
+    Returns (response_body, http_status).
+    """
+    ctx = new_validation_context(image_bytes, text)
+    return analyze_context(ctx, text, urgency, location, report_id)
+
+
+def analyze_context(ctx, text, urgency=None, location=None, report_id=None):
+    """run_analysis on a caller-held ValidationContext"""
+    hits = ctx.hits
+    
+    # ---- FIXED VALIDATION ----
+    is_valid, reason, debug_info = run_validation_cascade(ctx)
+    
+    if not is_valid:
+        log_raw_scores(ctx)
+        return {
+            "status": "rejected",
+            "message": reason,
+            "is_fake": True,
+            "debug": debug_info
+        }, 400
+    
+    # ---- TRIAGE ----
+    with metrics.stage_seconds.time(stage="priority"):
+        priority = decide_priority(text, hits)
+    if urgency is None:
+        with metrics.stage_seconds.time(stage="urgency"):
+            urgency = score_urgency(text)
+    
+    # ---- VERIFICATION SCORE ----
+    # Extract values from debug_info
+    desc_similarity = debug_info.get('description_match_score', 0)
+    civic_similarity = debug_info.get('civic_score', 0)
+    keywords_found = debug_info.get('keywords_found', [])
+    
+    verification_score = calculate_verification_score(
+        desc_similarity, 
+        civic_similarity, 
+        keywords_found
+    )
+    
+    # ---- DANGEROUS CONTENT DETECTION ----
+    with metrics.stage_seconds.time(stage="danger"):
+        is_dangerous, danger_type = detect_dangerous_content(
+            text, 
+            civic_similarity, 
+            keywords_found,
+            hits
+        )
+    
+    print(f"📊 Verification Score: {verification_score}/100")
+    print(f"⚠️ Dangerous Content: {is_dangerous} (Type: {danger_type})")
+    
+    # ---- SIMILAR-REPORT INDEX / SCORE LOG ----
+    index_id = index_report_embedding(ctx.image_embedding, report_id, location)
+    log_raw_scores(ctx, verification_score)
+    
+    return {
+        "status": "success",
+        "analysis": {
+            "priority": priority,
+            "is_critical": priority == "CRITICAL",
+            "urgency": round(urgency, 2),
+            "verification_score": verification_score,
+            "is_dangerous": is_dangerous,
+            "danger_type": danger_type,
+            "verification_reason": reason,
+            "validation_details": debug_info,
+            "similarity_index_id": index_id
+        }
+    }, 200
+
+# -------------------------------------------------
+# Inference Pool (admission control)
+# -------------------------------------------------
+# Model work runs on a bounded pool; once INFERENCE_WORKERS are busy and
+# INFERENCE_QUEUE_SIZE more are waiting, requests get 429 + Retry-After.
+inference_pool = InferencePool(
+    max_workers=int(os.getenv("INFERENCE_WORKERS", INFERENCE_MAX_BATCH)),
+    max_queue=int(os.getenv("INFERENCE_QUEUE_SIZE", 32))
+)
+
+
+def busy_response_body():
+    return {
+        "status": "error",
+        "message": "AI service is busy, please retry later"
+    }
+
+# -------------------------------------------------
+# Metrics
+# -------------------------------------------------
+metrics.registry.register(metrics.Gauge(
+    "civicaudit_inference_queue_depth",
+    "Items waiting in each micro-batching queue",
+    ["model"],
+    callback=lambda: {
+        (batcher.name,): batcher.stats()["queue_depth"]
+        for batcher in (yolo_batcher, yolo_lowres_batcher, clip_image_batcher, clip_text_batcher)
+    }
+))
+metrics.registry.register(metrics.Gauge(
+    "civicaudit_inference_pool_in_flight",
+    "Tasks admitted to the inference pool (running + queued)",
+    callback=lambda: inference_pool.stats()["in_flight"]
+))
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(
+        metrics.registry.render(),
+        mimetype="text/plain; version=0.0.4"
+    )
+
+# -------------------------------------------------
+# Request Profiling (opt-in)
+# -------------------------------------------------
+# With PROFILING=true, an /analyze request carrying the X-Profile header
+# (whose value must equal PROFILE_TOKEN when that is set) or picked at
+# PROFILE_SAMPLE_RATE is run under the torch profiler and a Python stack
+# sampler; the trace is written to PROFILE_DIR (newest PROFILE_MAX_TRACES
+# kept) and its id returned as "profile_id".
+request_profiler = RequestProfiler(
+    os.getenv("PROFILE_DIR", "profiles"),
+    enabled=os.getenv("PROFILING", "false").lower() == "true",
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+    token=os.getenv("PROFILE_TOKEN") or None,
+    max_traces=int(os.getenv("PROFILE_MAX_TRACES", 50)),
+    stack_interval=float(os.getenv("PROFILE_STACK_INTERVAL_MS", 5)) / 1000,
+    thread_prefixes=("batcher-",)
+)
+
+
+def profiled_analyze_report(image_bytes, text, urgency=None, location=None, report_id=None):
+    """analyze_report under the request profiler; the body carries the profile_id"""
+    image_format, image_size = read_image_header(image_bytes)
+    (body, status_code), profile_id = request_profiler.run(
+        analyze_report,
+        (image_bytes, text, urgency, location, report_id),
+        meta={
+            "endpoint": "/analyze",
+            "image_bytes": len(image_bytes),
+            "image_format": image_format,
+            "image_size": image_size,
+            "text_chars": len(text)
+        },
+        describe=lambda result: {
+            "http_status": result[1],
+            "cached": bool(result[0].get("cached")),
+            "message": result[0].get("message")
+        }
+    )
+    if profile_id is not None:
+        body = dict(body, profile_id=profile_id)
+    return body, status_code
+
+
+def _profiles_unavailable():
+    """Error response for the trace endpoints, or None when access is allowed"""
+    if not request_profiler.enabled:
+        return jsonify({"status": "error", "message": "Profiling is disabled (PROFILING=false)"}), 404
+    if request_profiler.token is not None and not request_profiler.authorized(request.headers):
+        return jsonify({
+            "status": "error",
+            "message": f"Send the profiling token in the {request_profiler.header} header"
+        }), 403
+    return None
+
+
+@app.route("/profiles", methods=["GET"])
+def list_profiles():
+    """Newest stored request profiles first"""
+    error = _profiles_unavailable()
+    if error is not None:
+        return error
+    return jsonify({"status": "success", "profiles": request_profiler.list()})
+
+
+@app.route("/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """Summary of one profile: top torch ops and hottest Python stacks"""
+    error = _profiles_unavailable()
+    if error is not None:
+        return error
+    summary = request_profiler.summary(profile_id)
+    if summary is None:
+        return jsonify({"status": "error", "message": f"No profile {profile_id}"}), 404
+    return jsonify(summary)
+
+
+@app.route("/profiles/<profile_id>/<name>", methods=["GET"])
+def get_profile_file(profile_id, name):
+    """
+    Raw trace files: trace.json (chrome://tracing / Perfetto),
+    stacks.folded (flamegraph.pl / speedscope), summary.json
+    """
+    error = _profiles_unavailable()
+    if error is not None:
+        return error
+    path = request_profiler.file_path(profile_id, name)
+    if path is None:
+        return jsonify({"status": "error", "message": f"No file {name} in profile {profile_id}"}), 404
+    return send_file(os.path.abspath(path), as_attachment=name != "summary.json")
+
 # -------------------------------------------------
 # Analyze Endpoint
 # -------------------------------------------------
 @app.route("/api/analyze", methods=["POST"])
 @app.route("/analyze", methods=["POST"])
 def analyze():
+    start = time.perf_counter()
+    with metrics.requests_in_flight.track():
+        response, status_code = _analyze()
+    metrics.analyze_seconds.observe(time.perf_counter() - start, status=status_code)
+    return response, status_code
+
+
+def read_analyze_form():
+    """
+    Check and read an /analyze-style multipart request.
+    Returns (fields, None), or (None, (response, status)) when the request
+    must be answered right away.
+    """
+    if not request.content_type or not request.content_type.startswith("multipart"):
+        return None, (jsonify({
+            "status": "error",
+            "message": "multipart/form-data required"
+        }), 415)
+    
+    if not models_ready():
+        response = jsonify(models_not_ready_response_body())
+        response.headers["Retry-After"] = "5"
+        return None, (response, 503)
+    
+    if request_too_large():
+        return None, upload_too_large_response()
+    
+    upload_start = time.perf_counter()
     try:
-        if not request.content_type or not request.content_type.startswith("multipart"):
-            return jsonify({
-                "status": "error",
-                "message": "multipart/form-data required"
-            }), 415
-        
         text = request.form.get("text", "").strip()
         image_file = request.files.get("image")
+    except RequestEntityTooLarge:
+        # Chunked body without a Content-Length, cut off while parsing
+        return None, upload_too_large_response()
+    
+    if not image_file:
+        return None, (jsonify({
+            "status": "rejected",
+            "message": "Please upload an image related to a civic problem",
+            "is_fake": True
+        }), 400)
+    
+    try:
+        image_bytes = read_image_upload(image_file)
+    except UploadRejected as e:
+        return None, (jsonify(upload_rejected_response_body(e)), e.status_code)
+    metrics.stage_seconds.observe(time.perf_counter() - upload_start, stage="upload_read")
+    
+    try:
+        location = parse_report_location(request.form)
+    except ValueError as e:
+        return None, (jsonify({"status": "error", "message": str(e)}), 400)
+    report_id = request.form.get("report_id") or None
+    
+    return {
+        "image_bytes": image_bytes,
+        "text": text,
+        "location": location,
+        "report_id": report_id
+    }, None
+
+
+def _analyze():
+    try:
+        fields, error = read_analyze_form()
+        if error is not None:
+            return error
         
-        if not image_file:
-            return jsonify({
-                "status": "rejected",
-                "message": "Please upload an image related to a civic problem",
-                "is_fake": True
-            }), 400
-        
-        image_bytes = image_file.read()
-        
-        # ---- FIXED VALIDATION ----
-        is_valid, reason, debug_info = validate_image_and_text(image_bytes, text)
-        
-        if not is_valid:
-            return jsonify({
-                "status": "rejected",
-                "message": reason,
-                "is_fake": True,
-                "debug": debug_info
-            }), 400
-        
-        # ---- TRIAGE ----
-        priority = decide_priority(text)
-        urgency = abs(TextBlob(text).sentiment.polarity)
-        
-        # ---- VERIFICATION SCORE ----
-        # Extract values from debug_info
-        desc_similarity = debug_info.get('description_match_score', 0)
-        civic_similarity = debug_info.get('civic_score', 0)
-        keywords_found = debug_info.get('keywords_found', [])
-        
-        verification_score = calculate_verification_score(
-            desc_similarity, 
-            civic_similarity, 
-            keywords_found
-        )
-        
-        # ---- DANGEROUS CONTENT DETECTION ----
-        is_dangerous, danger_type = detect_dangerous_content(
-            text, 
-            civic_similarity, 
-            keywords_found
-        )
-        
-        print(f"📊 Verification Score: {verification_score}/100")
-        print(f"⚠️ Dangerous Content: {is_dangerous} (Type: {danger_type})")
+        target = profiled_analyze_report if request_profiler.wants(request.headers) else analyze_report
+        try:
+            future = inference_pool.submit(
+                target, fields["image_bytes"], fields["text"], None,
+                fields["location"], fields["report_id"]
+            )
+        except PoolFullError as e:
+            response = jsonify(busy_response_body())
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response, 429
         
-        return jsonify({
-            "status": "success",
-            "analysis": {
-                "priority": priority,
-                "is_critical": priority == "CRITICAL",
-                "urgency": round(urgency, 2),
-                "verification_score": verification_score,
-                "is_dangerous": is_dangerous,
-                "danger_type": danger_type,
-                "verification_reason": reason,
-                "validation_details": debug_info
-            }
-        })
+        body, status_code = future.result()
+        return jsonify(body), status_code
     
     except Exception as e:
         import traceback
@@ -422,6 +1441,339 @@ def analyze():
             "traceback": traceback.format_exc()
         }), 500
 
+# -------------------------------------------------
+# Batch Analyze Endpoint (streamed NDJSON)
+# -------------------------------------------------
+# Items are analysed concurrently so the micro-batchers can group their
+# YOLO/CLIP passes; each result is written as soon as it is ready. Items
+# go through the inference pool like a single /analyze, at most
+# ANALYZE_BATCH_IN_FLIGHT at a time, so the rest of the pool stays free
+# for other requests and any batch size fits.
+ANALYZE_BATCH_MAX_ITEMS = int(os.getenv("ANALYZE_BATCH_MAX_ITEMS", 64))
+_batch_in_flight_limit = max(1, inference_pool.capacity - 1)   # one slot for others
+ANALYZE_BATCH_IN_FLIGHT = int(os.getenv(
+    "ANALYZE_BATCH_IN_FLIGHT", min(INFERENCE_MAX_BATCH, _batch_in_flight_limit)
+))
+UPLOAD_FILES_PER_REQUEST["analyze_batch"] = ANALYZE_BATCH_MAX_ITEMS
+
+if not 1 <= ANALYZE_BATCH_IN_FLIGHT <= _batch_in_flight_limit:
+    raise ValueError(
+        f"ANALYZE_BATCH_IN_FLIGHT must be between 1 and {_batch_in_flight_limit} "
+        f"(INFERENCE_WORKERS + INFERENCE_QUEUE_SIZE - 1), got {ANALYZE_BATCH_IN_FLIGHT}"
+    )
+
+
+def _analyze_batch_item(index, item_id, image_bytes, text, urgency=None):
+    try:
+        body, status_code = analyze_report(image_bytes, text, urgency, report_id=item_id)
+    except Exception as e:
+        print(f"Error in /analyze/batch item {index}: {str(e)}")
+        body, status_code = {"status": "error", "message": str(e)}, 500
+    return {"index": index, "id": item_id, "http_status": status_code, **body}
+
+
+@app.route("/api/analyze/batch", methods=["POST"])
+@app.route("/analyze/batch", methods=["POST"])
+def analyze_batch():
+    """
+    Multipart fields (repeated, matched by position):
+      image - one file per report
+      text  - one description per image
+      id    - optional caller reference echoed back in each result
+              (also the report's similar-report index id)
+    Response: application/x-ndjson, one JSON object per line in
+    completion order, each carrying its "index" in the request.
+    429 for the whole request if the inference pool cannot admit its
+    first item. If other requests fill the pool while none of the batch's
+    items is running, the remaining items get http_status 429 lines.
+    """
+    if not request.content_type or not request.content_type.startswith("multipart"):
+        return jsonify({
+            "status": "error",
+            "message": "multipart/form-data required"
+        }), 415
+    
+    if not models_ready():
+        response = jsonify(models_not_ready_response_body())
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    
+    if request_too_large(max_files=ANALYZE_BATCH_MAX_ITEMS):
+        return jsonify({
+            "status": "error",
+            "message": f"Batch too large (max {UPLOAD_MAX_BYTES // (1024 * 1024)} MB per image)"
+        }), 413
+    
+    image_files = request.files.getlist("image")
+    texts = request.form.getlist("text")
+    ids = request.form.getlist("id")
+    
+    if not image_files:
+        return jsonify({
+            "status": "error",
+            "message": "At least one image is required"
+        }), 400
+    
+    if len(texts) != len(image_files):
+        return jsonify({
+            "status": "error",
+            "message": f"Got {len(image_files)} images but {len(texts)} descriptions"
+        }), 400
+    
+    if len(image_files) > ANALYZE_BATCH_MAX_ITEMS:
+        return jsonify({
+            "status": "error",
+            "message": f"Batch too large (max {ANALYZE_BATCH_MAX_ITEMS} items)"
+        }), 413
+    
+    # Read uploads while the request context is still active; an upload
+    # that fails the size/format checks gets its result line right away
+    items, refused = [], []
+    for i, image_file in enumerate(image_files):
+        item_id = ids[i] if i < len(ids) else None
+        try:
+            items.append((i, item_id, read_image_upload(image_file), texts[i].strip()))
+        except UploadRejected as e:
+            refused.append({
+                "index": i, "id": item_id, "http_status": e.status_code,
+                **upload_rejected_response_body(e)
+            })
+    # The lexicon scorer rates every description in one call
+    if lexicon_urgency_scorer is not None:
+        urgencies = lexicon_urgency_scorer.score_batch([item[3] for item in items])
+        items = [item + (float(u),) for item, u in zip(items, urgencies)]
+    pending = deque(items)
+    in_flight = set()
+    
+    def submit_pending():
+        """Top the batch up to ANALYZE_BATCH_IN_FLIGHT items in the pool"""
+        while pending and len(in_flight) < ANALYZE_BATCH_IN_FLIGHT:
+            try:
+                in_flight.add(inference_pool.submit(_analyze_batch_item, *pending[0]))
+            except PoolFullError:
+                return
+            pending.popleft()
+    
+    submit_pending()
+    if pending and not in_flight:
+        response = jsonify(busy_response_body())
+        response.headers["Retry-After"] = str(inference_pool.retry_after())
+        return response, 429
+    
+    def generate():
+        for result in refused:
+            yield json.dumps(result) + "\n"
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            in_flight.difference_update(done)
+            submit_pending()
+            for future in done:
+                yield json.dumps(future.result()) + "\n"
+        # Other requests filled the pool while none of ours was running
+        retry_after = inference_pool.retry_after()
+        for item in pending:
+            yield json.dumps({
+                "index": item[0], "id": item[1], "http_status": 429,
+                "retry_after": retry_after, **busy_response_body()
+            }) + "\n"
+    
+    return Response(generate(), mimetype="application/x-ndjson")
+
+# -------------------------------------------------
+# Similar Reports Endpoint
+# -------------------------------------------------
+def _similar_query_params(form):
+    """Parse /similar search options; raises ValueError on bad input"""
+    try:
+        k = int(form.get("k", 5))
+        radius_m = float(form.get("radius_m", SIMILAR_DEFAULT_RADIUS_M))
+        max_age_hours = float(form.get("max_age_hours", SIMILAR_MAX_AGE_HOURS))
+        min_similarity = form.get("min_similarity")
+        min_similarity = float(min_similarity) if min_similarity not in (None, "") else None
+    except (TypeError, ValueError):
+        raise ValueError("k, radius_m, max_age_hours and min_similarity must be numbers")
+    if not 1 <= k <= 100:
+        raise ValueError("k must be between 1 and 100")
+    return {
+        "k": k,
+        "radius_m": radius_m,
+        "max_age_seconds": max_age_hours * 3600 if max_age_hours > 0 else None,
+        "min_similarity": min_similarity
+    }
+
+
+def _encode_query_image(image_bytes):
+    decoded = decode_image(image_bytes, min_long_side=YOLO_MIN_LONG_SIDE)
+    if decoded is None:
+        return None
+    return clip_image_batcher.run(decoded.rgb).float().cpu().numpy()
+
+
+@app.route("/api/similar", methods=["POST"])
+@app.route("/similar", methods=["POST"])
+def similar_reports():
+    """
+    Top-k visually similar recent reports near a location.
+    Form fields:
+      image | id          - query photo, or the id of an indexed report
+      latitude, longitude - search centre (defaults to the indexed report's)
+      radius_m            - default SIMILAR_DEFAULT_RADIUS_M
+      k, max_age_hours, min_similarity
+    Without a location, every indexed report is searched.
+    """
+    if not models_ready():
+        response = jsonify(models_not_ready_response_body())
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    
+    if similarity_index is None:
+        return jsonify({
+            "status": "error",
+            "message": "Similar-report index is disabled (EMBEDDING_INDEX=false)"
+        }), 404
+    
+    try:
+        params = _similar_query_params(request.form)
+        location = parse_report_location(request.form)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    query_id = request.form.get("id") or None
+    image_file = request.files.get("image")
+    
+    if query_id is not None:
+        entry = similarity_index.get(query_id)
+        if entry is None:
+            return jsonify({
+                "status": "error",
+                "message": f"No indexed report with id {query_id}"
+            }), 404
+        embedding, lat, lon = entry
+        if location is None and lat is not None:
+            location = (lat, lon)
+    elif image_file:
+        try:
+            image_bytes = read_image_upload(image_file)
+        except UploadRejected as e:
+            return jsonify(upload_rejected_response_body(e)), e.status_code
+        try:
+            future = inference_pool.submit(_encode_query_image, image_bytes)
+        except PoolFullError as e:
+            response = jsonify(busy_response_body())
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response, 429
+        embedding = future.result()
+        if embedding is None:
+            return jsonify({"status": "error", "message": "Invalid image file"}), 400
+    else:
+        return jsonify({
+            "status": "error",
+            "message": "Provide an image or the id of an indexed report"
+        }), 400
+    
+    lat, lon = location or (None, None)
+    with metrics.stage_seconds.time(stage="similar_search"):
+        results = similarity_index.query(
+            embedding, lat, lon,
+            radius_m=params["radius_m"] if location else None,
+            k=params["k"],
+            max_age_seconds=params["max_age_seconds"],
+            min_similarity=params["min_similarity"],
+            exclude_id=query_id
+        )
+    
+    return jsonify({
+        "status": "success",
+        "query": {
+            "id": query_id,
+            "latitude": lat,
+            "longitude": lon,
+            "radius_m": params["radius_m"] if location else None,
+            "k": params["k"]
+        },
+        "results": results
+    })
+
+# -------------------------------------------------
+# Asynchronous Analysis Jobs
+# -------------------------------------------------
+# POST /api/analyze/jobs answers 202 with a job id straight away and the
+# analysis runs on JOB_WORKERS background threads; descriptions that
+# decide_priority() rates CRITICAL jump the queue. Results are polled from
+# GET /api/analyze/jobs/<id> for JOB_RESULT_TTL_SECONDS after the job
+# finishes. Job records live in JOB_RESULT_DIR so that any gunicorn worker
+# can answer the poll (JOB_RESULT_DIR= keeps them in this process only).
+analysis_jobs = JobQueue(
+    analyze_report,
+    workers=int(os.getenv("JOB_WORKERS", 2)),
+    max_pending=int(os.getenv("JOB_QUEUE_SIZE", 256)),
+    result_ttl_seconds=float(os.getenv("JOB_RESULT_TTL_SECONDS", 3600)),
+    path=os.getenv("JOB_RESULT_DIR", "analysis_jobs") or None
+)
+
+metrics.registry.register(metrics.Gauge(
+    "civicaudit_analysis_jobs_pending",
+    "Analysis jobs waiting for a job worker",
+    callback=lambda: analysis_jobs.stats()["pending"]
+))
+
+
+def job_response_body(record):
+    body = {key: value for key, value in record.items() if key != "pid"}
+    body["poll_url"] = f"/api/analyze/jobs/{record['job_id']}"
+    return body
+
+
+@app.route("/api/analyze/jobs", methods=["POST"])
+@app.route("/analyze/jobs", methods=["POST"])
+def create_analysis_job():
+    """
+    Same form fields as /analyze. Answers 202 with the job id; poll
+    GET /api/analyze/jobs/<id> for the result.
+    """
+    fields, error = read_analyze_form()
+    if error is not None:
+        return error
+    
+    priority = decide_priority(fields["text"])
+    try:
+        record = analysis_jobs.submit(
+            (fields["image_bytes"], fields["text"], None, fields["location"], fields["report_id"]),
+            urgent=priority == "CRITICAL",
+            priority=priority
+        )
+    except JobQueueFull as e:
+        response = jsonify(busy_response_body())
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    
+    response = jsonify(job_response_body(record))
+    response.headers["Location"] = f"/api/analyze/jobs/{record['job_id']}"
+    return response, 202
+
+
+@app.route("/api/analyze/jobs/<job_id>", methods=["GET"])
+@app.route("/analyze/jobs/<job_id>", methods=["GET"])
+def get_analysis_job(job_id):
+    """
+    202 while queued/running, 200 once finished: status "done" with the
+    /analyze response body under "result" (and its status code under
+    "http_status"), or "failed" with an "error". 404 for unknown or
+    expired jobs.
+    """
+    record = analysis_jobs.get(job_id)
+    if record is None:
+        return jsonify({
+            "status": "error",
+            "message": f"No analysis job {job_id} (unknown or expired)"
+        }), 404
+    
+    status_code = 202 if record["status"] in ("queued", "running") else 200
+    response = jsonify(job_response_body(record))
+    if status_code == 202:
+        response.headers["Retry-After"] = "1"
+    return response, status_code
+
 # -------------------------------------------------
 # Run
 # -------------------------------------------------
@@ -433,4 +1785,8 @@ if __name__ == "__main__":
     print(f"Device: {device}")
     print(f"Port: {port}")
     print(f"{'='*60}\n")
+    # Load in the background so the port binds right away; with the debug
+    # reloader only the child process (WERKZEUG_RUN_MAIN) serves requests.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_model_loading()
     app.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
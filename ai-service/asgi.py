@@ -0,0 +1,158 @@
+"""
+Production ASGI entry point for the CivicAudit AI service.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+
+/analyze is served natively: the multipart upload is parsed on the event
+loop without blocking and read back in chunks under the same size, pixel
+and format limits as the Flask route, and the model work is handed to the
+bounded inference pool from app.py. A full pool answers 429 with Retry-After so
+the Node backend can back off. Every other route is served by the
+existing Flask app through a WSGI bridge.
+
+Models load on a background thread at startup; until /health/ready
+answers 200, /analyze returns 503 with Retry-After.
+"""
+import asyncio
+import time
+import traceback
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import app as flask_service
+from services import metrics
+from services.inference_pool import PoolFullError
+from utils.image_io import UPLOAD_CHUNK_SIZE, UploadReader, UploadRejected
+
+
+# -------------------------------------------------
+# Analyze Endpoint (async front end)
+# -------------------------------------------------
+async def analyze(request):
+    start = time.perf_counter()
+    with metrics.requests_in_flight.track():
+        response = await _analyze(request)
+    metrics.analyze_seconds.observe(
+        time.perf_counter() - start, status=response.status_code
+    )
+    return response
+
+
+async def _analyze(request):
+    try:
+        content_type = request.headers.get("content-type", "")
+        if not content_type.startswith("multipart"):
+            return JSONResponse({
+                "status": "error",
+                "message": "multipart/form-data required"
+            }, status_code=415)
+
+        content_length = request.headers.get("content-length", "")
+        if (flask_service.UPLOAD_MAX_BYTES and content_length.isdigit() and int(content_length)
+                > flask_service.UPLOAD_MAX_BYTES + flask_service.UPLOAD_FORM_OVERHEAD):
+            return JSONResponse(flask_service.upload_rejected_response_body(UploadRejected(
+                "upload_too_large",
+                f"Image file is too large (max {flask_service.UPLOAD_MAX_BYTES // (1024 * 1024)} MB)"
+            )), status_code=413)
+
+        upload_start = time.perf_counter()
+        async with request.form() as form:
+            text = str(form.get("text", "")).strip()
+            image_file = form.get("image")
+
+            if image_file is None or isinstance(image_file, str):
+                return JSONResponse({
+                    "status": "rejected",
+                    "message": "Please upload an image related to a civic problem",
+                    "is_fake": True
+                }, status_code=400)
+
+            reader = UploadReader(
+                flask_service.UPLOAD_MAX_BYTES,
+                flask_service.UPLOAD_MAX_PIXELS,
+                flask_service.UPLOAD_FORMATS
+            )
+            try:
+                while chunk := await image_file.read(UPLOAD_CHUNK_SIZE):
+                    reader.feed(chunk)
+                image_bytes = reader.finish()
+            except UploadRejected as e:
+                return JSONResponse(
+                    flask_service.upload_rejected_response_body(e), status_code=e.status_code
+                )
+            try:
+                location = flask_service.parse_report_location(form)
+            except ValueError as e:
+                return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+            report_id = str(form.get("report_id") or "") or None
+        metrics.stage_seconds.observe(time.perf_counter() - upload_start, stage="upload_read")
+
+        if not flask_service.models_ready():
+            return JSONResponse(
+                flask_service.models_not_ready_response_body(),
+                status_code=503,
+                headers={"Retry-After": "5"}
+            )
+
+        target = (
+            flask_service.profiled_analyze_report
+            if flask_service.request_profiler.wants(request.headers)
+            else flask_service.analyze_report
+        )
+        try:
+            future = flask_service.inference_pool.submit(
+                target, image_bytes, text, None, location, report_id
+            )
+        except PoolFullError as e:
+            return JSONResponse(
+                flask_service.busy_response_body(),
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+        body, status_code = await asyncio.wrap_future(future)
+        return JSONResponse(body, status_code=status_code)
+
+    except Exception as e:
+        print(f"Error in /analyze: {str(e)}")
+        print(traceback.format_exc())
+        return JSONResponse({
+            "status": "error",
+            "message": str(e),
+            "traceback": traceback.format_exc()
+        }, status_code=500)
+
+
+# -------------------------------------------------
+# App
+# -------------------------------------------------
+@asynccontextmanager
+async def lifespan(_app):
+    # Background load: the port binds immediately and /health/ready turns
+    # 200 once the models are loaded and warmed up
+    flask_service.start_model_loading()
+    yield
+
+
+app = Starlette(
+    lifespan=lifespan,
+    routes=[
+        Route("/api/analyze", analyze, methods=["POST"]),
+        Route("/analyze", analyze, methods=["POST"]),
+        Mount("/", app=WSGIMiddleware(flask_service.app)),
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=flask_service.cors_origins,
+            allow_methods=["*"],
+            allow_headers=["*"]
+        )
+    ]
+)
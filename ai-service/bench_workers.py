@@ -0,0 +1,204 @@
+"""
+Memory-per-worker and throughput scaling benchmark for the pre-fork mode.
+
+    python bench_workers.py --workers 1 2 4 --duration 30 --concurrency 16
+
+For each worker count it starts `gunicorn -c gunicorn.conf.py`, waits
+until /health/ready answers 200, drives /analyze with synthetic images from
+`--concurrency` client threads, then reads /proc/<pid>/smaps_rollup for the
+master and every worker. PSS (proportional set size) splits shared pages
+between the processes sharing them, so it shows what each worker really
+adds; RSS counts the shared model weights in full for every process.
+
+Results are printed as a markdown table and written to --output as JSON.
+Linux only (needs /proc).
+
+No reference numbers are checked in: results depend on the host and the
+model weights, so record them on the deployment hardware.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# -------------------------------------------------
+# Helpers
+# -------------------------------------------------
+def synthetic_jpegs(count, width=1280, height=960, seed=0):
+    """Distinct road-like JPEGs (so the result cache can never hit)"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        img = np.full((height, width, 3), 110, np.uint8)
+        img += rng.integers(0, 40, (height, width, 3), dtype=np.uint8)
+        cx, cy = rng.integers(200, width - 200), rng.integers(200, height - 200)
+        cv2.ellipse(img, (int(cx), int(cy)), (160, 90), 0, 0, 360, (40, 40, 45), -1)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        images.append(buf.tobytes())
+    return images
+
+
+def memory_kb(pid):
+    """{'rss': kB, 'pss': kB, 'private': kB} from smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":"):
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+def child_pids(pid):
+    pids = []
+    task_dir = f"/proc/{pid}/task"
+    for tid in os.listdir(task_dir):
+        with open(f"{task_dir}/{tid}/children") as f:
+            pids.extend(int(p) for p in f.read().split())
+    return pids
+
+
+def wait_until_up(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+
+def drive_load(url, images, text, concurrency, duration):
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(offset):
+        i = offset
+        session = requests.Session()
+        while time.time() < stop_at:
+            image = images[i % len(images)]
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                r = session.post(
+                    url,
+                    files={"image": ("bench.jpg", image, "image/jpeg")},
+                    data={"text": text},
+                    timeout=120
+                )
+                status = r.status_code
+            except requests.RequestException:
+                status = "error"
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status in (200, 400):
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, statuses
+
+
+# -------------------------------------------------
+# Benchmark
+# -------------------------------------------------
+def run_one(workers, args, images):
+    env = dict(
+        os.environ,
+        GUNICORN_WORKERS=str(workers),
+        PORT=str(args.port),
+        RESULT_CACHE_SIZE="0"
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        cwd=HERE, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        if not wait_until_up(f"{base}/health/ready", args.startup_timeout):
+            raise RuntimeError(f"service with {workers} workers did not start")
+
+        latencies, statuses = drive_load(
+            f"{base}/analyze", images, args.text, args.concurrency, args.duration
+        )
+
+        master = memory_kb(server.pid)
+        worker_mem = [memory_kb(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0
+    total_pss = master["pss"] + sum(m["pss"] for m in worker_mem)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / args.duration, 2),
+        "p50_ms": round(pct(0.50) * 1000, 1),
+        "p95_ms": round(pct(0.95) * 1000, 1),
+        "master_rss_mb": round(master["rss"] / 1024, 1),
+        "worker_rss_mb": round(np.mean([m["rss"] for m in worker_mem]) / 1024, 1) if worker_mem else 0,
+        "worker_pss_mb": round(np.mean([m["pss"] for m in worker_mem]) / 1024, 1) if worker_mem else 0,
+        "worker_private_mb": round(np.mean([m["private"] for m in worker_mem]) / 1024, 1) if worker_mem else 0,
+        "total_pss_mb": round(total_pss / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--text", default="Large pothole on the road near the street corner")
+    parser.add_argument("--output", default="bench_workers.json")
+    args = parser.parse_args()
+
+    images = synthetic_jpegs(64)
+    results = []
+    for n in args.workers:
+        print(f"Benchmarking {n} worker(s)...")
+        results.append(run_one(n, args, images))
+
+    print("\n| workers | req/s | p50 ms | p95 ms | worker RSS MB | worker PSS MB | worker private MB | total PSS MB |")
+    print("|---|---|---|---|---|---|---|---|")
+    for r in results:
+        print(
+            f"| {r['workers']} | {r['throughput_rps']} | {r['p50_ms']} | {r['p95_ms']} "
+            f"| {r['worker_rss_mb']} | {r['worker_pss_mb']} | {r['worker_private_mb']} "
+            f"| {r['total_pss_mb']} |"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Offline throughput / latency benchmark for the CivicAudit AI service.
+
+    python benchmark.py --resolutions 640x480 1920x1080 4000x3000 \
+        --batch-sizes 1 2 4 8 --repeats 20 --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.15
+
+Everything runs in-process on synthetic images and descriptions, with no
+server, network or fixture files. For each resolution it measures:
+
+- single-item stages: decode, keyword scan, priority, urgency
+- model stages at every batch size: yolo, yolo_lowres, clip_image,
+  clip_text (batch of b items in one forward pass)
+- validate / analyze: b concurrent calls of validate_image_and_text and
+  of POST /analyze (Flask test client), so the micro-batchers group them
+
+Each row reports p50/p95/p99 latency per call, items/sec and peak RSS.
+With --baseline, rows are matched against a saved result file and the
+exit status is 1 if any p50 or throughput regressed by more than
+--tolerance.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+# Benchmark the models, not the result or CLIP text caches (the fixed
+# descriptions would hit them); allow the largest batch.
+# Keep the synthetic reports out of the similar-report index and score log.
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+os.environ.setdefault("CLIP_TEXT_CACHE_SIZE", "0")
+os.environ["EMBEDDING_INDEX"] = "false"
+os.environ["SCORE_LOG"] = "false"
+
+import cv2
+import numpy as np
+
+DESCRIPTIONS = [
+    "Large pothole in the middle of the road near the bus stop",
+    "Garbage dump overflowing on the street, bad smell and litter everywhere",
+    "Water leakage from a broken pipe flooding the footpath",
+    "Sparking electric wire hanging from the streetlight pole, very dangerous",
+    "Sewage overflowing from the manhole into the drainage gutter",
+]
+
+
+# -------------------------------------------------
+# Synthetic Inputs
+# -------------------------------------------------
+def synthetic_image(width, height, seed):
+    """Road-like JPEG: textured asphalt, a dark pothole and a lane marking"""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 105, np.uint8)
+    noise = rng.integers(0, 35, (height // 4 + 1, width // 4 + 1, 3), dtype=np.uint8)
+    img += cv2.resize(noise, (width, height), interpolation=cv2.INTER_NEAREST)
+    cv2.line(img, (0, height // 2), (width, height // 2), (220, 220, 220), max(2, height // 60))
+    center = (int(rng.integers(width // 4, 3 * width // 4)), int(rng.integers(height // 4, 3 * height // 4)))
+    cv2.ellipse(img, center, (width // 8, height // 10), 0, 0, 360, (35, 35, 40), -1)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return buf.tobytes()
+
+
+def parse_resolution(value):
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+# -------------------------------------------------
+# Measurement
+# -------------------------------------------------
+def reset_peak_rss():
+    """Reset VmHWM (Linux >= 4.0); returns False where unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(fn, items_per_call, repeats, warmup):
+    for _ in range(warmup):
+        fn()
+    reset_peak_rss()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies = np.asarray(latencies)
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+        "items_per_sec": round(items_per_call / float(np.mean(latencies)), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def concurrently(fn, args_list):
+    threads = [threading.Thread(target=fn, args=args) for args in args_list]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+# -------------------------------------------------
+# Benchmark
+# -------------------------------------------------
+def run(args):
+    import app
+    from utils.image_io import decode_image
+
+    app.load_models()
+
+    client = app.app.test_client()
+    rows = []
+
+    def record(stage, resolution, batch, result):
+        row = {"stage": stage, "resolution": resolution, "batch": batch, **result}
+        rows.append(row)
+        print(
+            f"{stage:>12} {resolution:>10} b={batch:<3} "
+            f"p50={row['p50_ms']:>9.2f}ms p95={row['p95_ms']:>9.2f}ms "
+            f"p99={row['p99_ms']:>9.2f}ms {row['items_per_sec']:>8.2f}/s "
+            f"peak={row['peak_rss_mb']:.0f}MB"
+        )
+
+    max_batch = max(args.batch_sizes)
+    texts = [DESCRIPTIONS[i % len(DESCRIPTIONS)] for i in range(max_batch)]
+
+    # ---- text stages (resolution independent) ----
+    text = DESCRIPTIONS[3]
+    hits = app.text_matcher.scan(text)
+    bench = lambda fn: measure(fn, 1, args.repeats * 10, args.warmup)
+    record("keywords", "-", 1, bench(lambda: app.text_matcher.scan(text)))
+    record("priority", "-", 1, bench(lambda: app.decide_priority(text, hits)))
+    record("urgency", "-", 1, bench(lambda: app.score_urgency(text)))
+
+    for resolution in args.resolutions:
+        width, height = parse_resolution(resolution)
+        images = [synthetic_image(width, height, seed) for seed in range(max_batch)]
+        decoded = [decode_image(b) for b in images]
+
+        record("decode", resolution, 1, measure(
+            lambda: decode_image(images[0]), 1, args.repeats, args.warmup
+        ))
+
+        for b in args.batch_sizes:
+            bgr = [d.bgr for d in decoded[:b]]
+            rgb = [d.rgb for d in decoded[:b]]
+            record("yolo", resolution, b, measure(
+                lambda: app._yolo_batch(bgr), b, args.repeats, args.warmup
+            ))
+            record("yolo_lowres", resolution, b, measure(
+                lambda: app._yolo_lowres_batch(bgr), b, args.repeats, args.warmup
+            ))
+            record("clip_image", resolution, b, measure(
+                lambda: app.clip_scorer.encode_images(rgb), b, args.repeats, args.warmup
+            ))
+            if resolution == args.resolutions[0]:
+                record("clip_text", "-", b, measure(
+                    lambda: app.clip_scorer.encode_texts(texts[:b]), b, args.repeats, args.warmup
+                ))
+
+            pairs = [(images[i], texts[i]) for i in range(b)]
+            record("validate", resolution, b, measure(
+                lambda: concurrently(app.validate_image_and_text, pairs),
+                b, args.repeats, args.warmup
+            ))
+
+            def post(image_bytes, description):
+                client.post(
+                    "/analyze",
+                    data={"text": description, "image": (io.BytesIO(image_bytes), "bench.jpg")},
+                    content_type="multipart/form-data"
+                )
+            record("analyze", resolution, b, measure(
+                lambda: concurrently(post, pairs), b, args.repeats, args.warmup
+            ))
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "device": app.device,
+            "inference_backend": app.INFERENCE_BACKEND,
+            "repeats": args.repeats,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": rows
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Print regressions against a baseline; returns how many were found"""
+    key = lambda r: (r["stage"], r["resolution"], r["batch"])
+    previous = {key(r): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nComparison against baseline (tolerance {tolerance:.0%}):")
+    for row in current["results"]:
+        old = previous.get(key(row))
+        if old is None:
+            continue
+        slower = row["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        less_throughput = 1 - row["items_per_sec"] / old["items_per_sec"] if old["items_per_sec"] else 0.0
+        if slower > tolerance or less_throughput > tolerance:
+            regressions += 1
+            print(
+                f"  REGRESSION {row['stage']} {row['resolution']} b={row['batch']}: "
+                f"p50 {old['p50_ms']} -> {row['p50_ms']} ms ({slower:+.0%}), "
+                f"{old['items_per_sec']} -> {row['items_per_sec']} items/s"
+            )
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--resolutions", nargs="+", default=["640x480", "1920x1080", "4000x3000"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="saved result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    # Let the micro-batchers form batches as large as the biggest batch size
+    os.environ.setdefault("INFERENCE_MAX_BATCH", str(max(args.batch_sizes)))
+
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
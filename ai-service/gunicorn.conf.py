@@ -0,0 +1,77 @@
+"""
+Pre-fork multi-worker mode for the CivicAudit AI service.
+
+    gunicorn -c gunicorn.conf.py
+
+The app is imported ONCE in the gunicorn master (`preload_app`) and the
+YOLO + CLIP weights are loaded there in `on_starting`. Workers are forked
+from it and share the weight pages copy-on-write, so each extra worker
+costs its own Python heap and activations, not another copy of the models.
+Each worker runs its own warm-up after the fork before reporting ready.
+
+Each worker limits torch to TORCH_THREADS_PER_WORKER intra-op threads so
+N workers on N cores do not oversubscribe the CPU.
+"""
+import gc
+import os
+
+import torch
+
+# -------------------------------------------------
+# Workers
+# -------------------------------------------------
+cpu_count = os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+workers = int(os.getenv("GUNICORN_WORKERS", cpu_count))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+wsgi_app = os.getenv("GUNICORN_APP", "asgi:app")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+preload_app = True
+
+TORCH_THREADS_PER_WORKER = int(
+    os.getenv("TORCH_THREADS_PER_WORKER", max(1, cpu_count // workers))
+)
+
+# The master must never start an OpenMP thread team: GNU OpenMP is not
+# fork-safe and children would hang on their first parallel op. With one
+# thread, model loading and prompt pre-encoding run serially in the master.
+torch.set_num_threads(1)
+
+
+# -------------------------------------------------
+# Hooks
+# -------------------------------------------------
+def on_starting(server):
+    # Load the weights in the master (no warm-up: that runs per worker after
+    # the fork, on the worker's own thread settings)
+    import app
+    app.load_models(warmup=False)
+
+
+def when_ready(server):
+    # Move everything allocated during preload into the permanent
+    # generation so the workers' garbage collector never writes to (and
+    # thereby un-shares) those pages.
+    gc.freeze()
+    server.log.info(
+        f"Models preloaded; forking {workers} workers "
+        f"x {TORCH_THREADS_PER_WORKER} torch threads"
+    )
+
+
+def post_fork(server, worker):
+    torch.set_num_threads(TORCH_THREADS_PER_WORKER)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Already fixed for this process; the intra-op setting is what matters
+        pass
+    server.log.info(
+        f"Worker {worker.pid}: torch threads = {torch.get_num_threads()}"
+    )
+
+    # Warm up (the weights came preloaded from the master) whatever the
+    # worker class: only the uvicorn lifespan would otherwise start it
+    import app
+    app.start_model_loading()
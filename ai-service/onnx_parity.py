@@ -0,0 +1,175 @@
+"""
+Parity check between the PyTorch and ONNX Runtime inference backends.
+
+    python onnx_parity.py --images path/to/report_images --quantize
+
+Every image is scored by both backends (YOLO objects + the three CLIP
+scores). The report shows how far each score moves compared with its
+decision threshold (DESCRIPTION_MATCH_THRESHOLD, CIVIC_IMAGE_THRESHOLD,
+CIVIC_VS_NONCIVIC_MARGIN) and counts every accept/reject decision that
+flips. Without --images, synthetic images are used, which is enough to
+catch a broken export but not to sign off a quantized model.
+
+Exit status is 1 if any decision flips.
+"""
+import argparse
+import json
+import os
+import sys
+
+# The reference side must be eager PyTorch
+os.environ["INFERENCE_BACKEND"] = "torch"
+
+import cv2
+import numpy as np
+
+import app
+from services.clip_engine import ClipScorer
+from services.onnx_backend import load_onnx_models
+from utils.image_io import decode_image
+
+DESCRIPTIONS = [
+    "Large pothole in the middle of the road",
+    "Garbage dump overflowing near the street corner",
+    "Water leakage from a broken pipe on the footpath",
+    "Broken streetlight pole with hanging electric wire",
+    "Sewage overflowing into the drainage on our street",
+]
+
+
+def load_images(image_dir, limit):
+    if image_dir:
+        names = sorted(
+            n for n in os.listdir(image_dir)
+            if n.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".bmp"))
+        )[:limit]
+        for name in names:
+            with open(os.path.join(image_dir, name), "rb") as f:
+                yield name, f.read()
+        return
+
+    rng = np.random.default_rng(0)
+    for i in range(limit):
+        img = rng.integers(60, 200, (720, 960, 3), dtype=np.uint8)
+        img = cv2.GaussianBlur(img, (0, 0), 9)
+        ok, buf = cv2.imencode(".jpg", img)
+        yield f"synthetic_{i}.jpg", buf.tobytes()
+
+
+def scores(scorer, yolo_model, decoded, text):
+    image_embedding = scorer.encode_images(decoded.rgb)[0]
+    text_embedding = scorer.encode_texts([text])[0]
+    desc, prompts = scorer.score(image_embedding, text_embedding)
+    result = yolo_model(decoded.bgr, verbose=False)[0]
+    objects = {yolo_model.names[int(c)] for c in result.boxes.cls}
+    return {
+        "desc": desc,
+        "civic": prompts[app.CIVIC_CLIP_PROMPT],
+        "non_civic": prompts[app.NON_CIVIC_PROMPT],
+        "objects": objects
+    }
+
+
+def decisions(s):
+    return {
+        "description_match": s["desc"] >= app.DESCRIPTION_MATCH_THRESHOLD,
+        "civic_image": s["civic"] >= app.CIVIC_IMAGE_THRESHOLD,
+        "civic_vs_noncivic": s["civic"] >= s["non_civic"] + app.CIVIC_VS_NONCIVIC_MARGIN,
+        "junk_objects": bool(s["objects"] & app.JUNK_OBJECTS)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--images", help="directory of report images (default: synthetic)")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--quantize", action="store_true", help="check the int8 models")
+    parser.add_argument("--model-dir", default=app.ONNX_MODEL_DIR)
+    parser.add_argument("--output", help="write the full report as JSON")
+    args = parser.parse_args()
+
+    app.load_models(warmup=False)
+    onnx_yolo, onnx_clip = load_onnx_models(
+        args.model_dir, app.YOLO_WEIGHTS, app.CLIP_MODEL_NAME, quantize=args.quantize
+    )
+    onnx_scorer = ClipScorer(
+        onnx_clip, app.clip_processor, "cpu",
+        prompts=[app.CIVIC_CLIP_PROMPT, app.NON_CIVIC_PROMPT]
+    )
+
+    thresholds = {
+        "desc": app.DESCRIPTION_MATCH_THRESHOLD,
+        "civic": app.CIVIC_IMAGE_THRESHOLD,
+    }
+    deltas = {"desc": [], "civic": [], "non_civic": []}
+    at_risk = {"desc": 0, "civic": 0}
+    flips = {}
+    object_mismatches = 0
+    rows = []
+
+    for i, (name, image_bytes) in enumerate(load_images(args.images, args.limit)):
+        decoded = decode_image(image_bytes)
+        if decoded is None:
+            print(f"Skipping undecodable image {name}")
+            continue
+        text = DESCRIPTIONS[i % len(DESCRIPTIONS)]
+        ref = scores(app.clip_scorer, app.yolo_model, decoded, text)
+        got = scores(onnx_scorer, onnx_yolo, decoded, text)
+
+        for key in deltas:
+            deltas[key].append(abs(got[key] - ref[key]))
+        for key, threshold in thresholds.items():
+            # Reference score sits closer to the threshold than the drift
+            if abs(ref[key] - threshold) <= abs(got[key] - ref[key]):
+                at_risk[key] += 1
+        object_mismatches += ref["objects"] != got["objects"]
+
+        ref_decisions, got_decisions = decisions(ref), decisions(got)
+        flipped = [k for k in ref_decisions if ref_decisions[k] != got_decisions[k]]
+        for k in flipped:
+            flips[k] = flips.get(k, 0) + 1
+        rows.append({
+            "image": name,
+            "torch": {k: (sorted(v) if k == "objects" else round(v, 4)) for k, v in ref.items()},
+            "onnx": {k: (sorted(v) if k == "objects" else round(v, 4)) for k, v in got.items()},
+            "flipped": flipped
+        })
+
+    count = len(rows)
+    if not count:
+        print("No images scored")
+        return 1
+
+    summary = {
+        "images": count,
+        "quantized": args.quantize,
+        "score_drift": {
+            key: {
+                "max": round(float(np.max(v)), 5),
+                "mean": round(float(np.mean(v)), 5),
+                "p99": round(float(np.percentile(v, 99)), 5)
+            }
+            for key, v in deltas.items()
+        },
+        "max_drift_vs_threshold": {
+            "DESCRIPTION_MATCH_THRESHOLD": round(float(np.max(deltas["desc"])) / thresholds["desc"], 4),
+            "CIVIC_IMAGE_THRESHOLD": round(float(np.max(deltas["civic"])) / thresholds["civic"], 4),
+            "CIVIC_VS_NONCIVIC_MARGIN": round(
+                float(np.max(np.add(deltas["civic"], deltas["non_civic"]))) / app.CIVIC_VS_NONCIVIC_MARGIN, 4
+            )
+        },
+        "near_threshold": at_risk,
+        "yolo_object_mismatches": object_mismatches,
+        "decision_flips": flips
+    }
+
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "images": rows}, f, indent=2)
+
+    return 1 if flips else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Re-evaluate validation thresholds and verification-score weights against a
+raw score log (SCORE_LOG=true), without running any model.
+
+    python replay_thresholds.py score_log
+    python replay_thresholds.py score_log --desc 0.18 0.20 0.22 --civic 0.20 0.22 0.24
+    python replay_thresholds.py score_log --margin 0.03 0.05 --since-hours 168 --json sweep.json
+
+Every combination of --desc / --civic / --margin is evaluated over all
+logged reports at once with numpy, replaying the cascade in the order the
+service used (the first failing stage gives the rejection reason). For
+each combination it reports the acceptance rate, decisions that flip
+against what the service actually answered, the rejection reasons, and
+the verification-score distribution of accepted reports.
+
+The first row always uses the thresholds recorded in the log. It must
+reproduce the logged decisions exactly (exit status 1 otherwise): a
+mismatch means this script and the service disagree and the other rows
+cannot be trusted.
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+
+import numpy as np
+
+from services.score_log import ScoreLog
+
+
+# -------------------------------------------------
+# Vectorized Decisions
+# -------------------------------------------------
+def junk_mask(columns, metadata):
+    """Boolean per row: YOLO saw any of the log's junk object classes"""
+    classes = metadata["yolo_classes"]
+    words = columns["yolo_classes"].shape[1]
+    junk_bits = np.zeros(words, np.uint64)
+    for name in metadata["junk_objects"]:
+        if name in classes:
+            index = classes.index(name)
+            junk_bits[index // 64] |= np.uint64(1 << (index % 64))
+    return (np.asarray(columns["yolo_classes"]) & junk_bits).any(axis=1)
+
+
+def replay(columns, metadata, junk, desc_threshold, civic_threshold, margin):
+    """Reason index per row (0 = accepted), same order as the service cascade"""
+    reasons = metadata["reasons"]
+    has_text = columns["has_text"].astype(bool)
+    image_valid = columns["image_valid"].astype(bool)
+    civic_keywords = columns["civic_keywords"] > 0
+    # float64 like the service's Python floats, so boundary cases compare equally
+    desc = columns["desc_similarity"].astype(np.float64)
+    civic = columns["civic_similarity"].astype(np.float64)
+    noncivic = columns["noncivic_similarity"].astype(np.float64)
+
+    # (failed, reason) per stage; a stage fails only where earlier ones passed
+    checks = {
+        "text_present": [(~has_text, "empty_description")],
+        "civic_keywords": [(~civic_keywords, "no_civic_keywords")],
+        "image_valid": [(~image_valid, "invalid_image")],
+        "yolo_junk": [(~image_valid, "invalid_image"), (junk, "junk_objects")],
+        "clip": [
+            (~image_valid, "invalid_image"),
+            (desc < desc_threshold, "description_mismatch"),
+            (civic < civic_threshold, "not_civic"),
+            (civic < noncivic + margin, "more_non_civic"),
+        ],
+    }
+    conditions, choices = [], []
+    for stage in metadata["stage_order"]:
+        for failed, reason in checks[stage]:
+            conditions.append(failed)
+            choices.append(reasons.index(reason))
+    return np.select(conditions, choices, default=0).astype(np.uint8)
+
+
+def verification_scores(columns, args):
+    """Vectorized calculate_verification_score with tunable weights"""
+    desc_lo, desc_hi = args.desc_range
+    civic_lo, civic_hi = args.civic_range
+    # The service scores the similarities as reported, rounded to 3 places
+    desc = np.round(columns["desc_similarity"].astype(np.float64), 3)
+    civic = np.round(columns["civic_similarity"].astype(np.float64), 3)
+    desc_score = np.clip((desc - desc_lo) / (desc_hi - desc_lo) * args.desc_points, 0, args.desc_points)
+    civic_score = np.clip((civic - civic_lo) / (civic_hi - civic_lo) * args.civic_points, 0, args.civic_points)
+    keyword_score = np.minimum(args.keyword_cap, columns["civic_keywords"].astype(np.float64) * args.keyword_points)
+    return np.round(np.clip(desc_score + civic_score + keyword_score, 0, 100))
+
+
+# -------------------------------------------------
+# Main
+# -------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("log_dir", help="SCORE_LOG_DIR of the service")
+    parser.add_argument("--desc", type=float, nargs="+", help="DESCRIPTION_MATCH_THRESHOLD values")
+    parser.add_argument("--civic", type=float, nargs="+", help="CIVIC_IMAGE_THRESHOLD values")
+    parser.add_argument("--margin", type=float, nargs="+", help="CIVIC_VS_NONCIVIC_MARGIN values")
+    parser.add_argument("--since-hours", type=float, help="only replay recent reports")
+    parser.add_argument("--desc-range", type=float, nargs=2, default=[0.2, 0.6])
+    parser.add_argument("--desc-points", type=float, default=40)
+    parser.add_argument("--civic-range", type=float, nargs=2, default=[0.22, 0.5])
+    parser.add_argument("--civic-points", type=float, default=30)
+    parser.add_argument("--keyword-points", type=float, default=6)
+    parser.add_argument("--keyword-cap", type=float, default=30)
+    parser.add_argument("--json", help="write every row of the sweep to this file")
+    args = parser.parse_args()
+
+    columns, metadata = ScoreLog.load(args.log_dir)
+    if args.since_hours is not None:
+        recent = columns["timestamp"] >= time.time() - args.since_hours * 3600
+        columns = {name: np.asarray(values)[recent] for name, values in columns.items()}
+    rows = len(columns["reason"])
+    if not rows:
+        print("Score log is empty")
+        return 1
+
+    start = time.perf_counter()
+    reasons = metadata["reasons"]
+    recorded = metadata["thresholds"]
+    live_reason = np.asarray(columns["reason"])
+    live_accepted = live_reason == 0
+    junk = junk_mask(columns, metadata)
+    scores = verification_scores(columns, args)
+
+    baseline = (
+        recorded["DESCRIPTION_MATCH_THRESHOLD"],
+        recorded["CIVIC_IMAGE_THRESHOLD"],
+        recorded["CIVIC_VS_NONCIVIC_MARGIN"],
+    )
+    grid = list(itertools.product(
+        args.desc or [baseline[0]], args.civic or [baseline[1]], args.margin or [baseline[2]]
+    ))
+    combos = [baseline] + [c for c in grid if c != baseline]
+
+    results = []
+    for desc_threshold, civic_threshold, margin in combos:
+        reason = replay(columns, metadata, junk, desc_threshold, civic_threshold, margin)
+        accepted = reason == 0
+        counts = np.bincount(reason, minlength=len(reasons))
+        accepted_scores = scores[accepted]
+        results.append({
+            "desc": desc_threshold,
+            "civic": civic_threshold,
+            "margin": margin,
+            "accepted": int(accepted.sum()),
+            "acceptance_rate": round(float(accepted.mean()), 4),
+            "newly_accepted": int((accepted & ~live_accepted).sum()),
+            "newly_rejected": int((~accepted & live_accepted).sum()),
+            "reason_changed": int((reason != live_reason).sum()),
+            "reasons": {reasons[i]: int(n) for i, n in enumerate(counts) if n and i},
+            "verification_score": {
+                "mean": round(float(accepted_scores.mean()), 1) if accepted_scores.size else None,
+                "p10": float(np.percentile(accepted_scores, 10)) if accepted_scores.size else None,
+                "p50": float(np.percentile(accepted_scores, 50)) if accepted_scores.size else None,
+            },
+        })
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    # Self-check: the recorded thresholds must reproduce the live answers
+    base = results[0]
+    live_scores = np.asarray(columns["verification_score"])
+    score_mismatches = int((scores[live_accepted] != live_scores[live_accepted]).sum())
+    print(f"{rows} reports, {len(combos)} threshold sets replayed in {elapsed_ms:.1f} ms")
+    print(
+        f"Baseline check: {base['reason_changed']} decision and "
+        f"{score_mismatches} verification-score mismatches against the log"
+    )
+
+    print("\n| desc | civic | margin | accepted | rate | +accepted | -rejected | mean score | top rejection |")
+    print("|---|---|---|---|---|---|---|---|---|")
+    for r in results:
+        top = max(r["reasons"].items(), key=lambda item: item[1])[0] if r["reasons"] else "-"
+        print(
+            f"| {r['desc']} | {r['civic']} | {r['margin']} | {r['accepted']} "
+            f"| {r['acceptance_rate']:.1%} | {r['newly_accepted']} | {r['newly_rejected']} "
+            f"| {r['verification_score']['mean']} | {top} |"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": rows, "metadata": metadata, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 1 if base["reason_changed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+Bulk offline re-scoring of historical reports.
+
+    python rescore.py --manifest reports.jsonl --output rescored.jsonl
+    python rescore.py --images ../backend/uploads/reports --text "pothole on the road" \
+        --output rescored.parquet
+    python rescore.py --manifest reports.jsonl --output rescored.jsonl --resume
+
+The manifest has one JSON object per line:
+
+    {"id": "<report id>", "image": "uploads/reports/abc.jpg", "text": "<title>. <description>"}
+
+Relative image paths resolve against --image-root (default: the
+manifest's directory). With --images, every image under the directory is
+scored against the same --text, using its relative path as the id.
+
+Images are read and decoded in --workers worker processes, which keep
+--prefetch batches ready ahead of the models. YOLO and CLIP then run over
+each whole batch, every raw signal is computed for every report, and the
+service's validation cascade and triage decide the outcome. Nothing goes
+through HTTP.
+
+Output is JSONL, or Parquet when --output ends in .parquet. Parquet output
+is a directory of part files and needs pyarrow. The output is also the
+checkpoint: --resume skips every id it already contains. JSONL is synced
+after each batch; a Parquet part is written every --checkpoint-every rows.
+
+With --score-log DIR the raw signals are also appended to a score log
+for replay_thresholds.py.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+# Bulk runs must not touch the live service's similar-report index or
+# score log (--score-log writes a separate one)
+os.environ["EMBEDDING_INDEX"] = "false"
+os.environ["SCORE_LOG"] = "false"
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+COLUMNS = [
+    "id", "image", "status", "reason_code", "message",
+    "desc_similarity", "civic_similarity", "noncivic_similarity",
+    "detected_objects", "yolo_escalated", "civic_keywords",
+    "priority", "urgency", "verification_score", "is_dangerous", "danger_type",
+]
+
+
+# -------------------------------------------------
+# Input
+# -------------------------------------------------
+def iter_manifest(path, image_root):
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield {
+                "id": str(record.get("id", line_number)),
+                "image": os.path.join(image_root, record["image"]),
+                "text": record.get("text") or "",
+            }
+
+
+def iter_image_dir(path, text):
+    for root, _, names in sorted(os.walk(path)):
+        for name in sorted(names):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                full = os.path.join(root, name)
+                yield {"id": os.path.relpath(full, path), "image": full, "text": text}
+
+
+def chunked(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# -------------------------------------------------
+# Decode Workers
+# -------------------------------------------------
+def _init_worker():
+    import cv2
+    # One decode per process; the pool itself provides the parallelism
+    cv2.setNumThreads(1)
+
+
+def decode_batch(batch, min_long_side):
+    """Read + decode one batch; returns [(DecodedImage | None, error | None)]"""
+    from utils.image_io import decode_image
+
+    decoded = []
+    for item in batch:
+        try:
+            with open(item["image"], "rb") as f:
+                image_bytes = f.read()
+        except OSError as e:
+            decoded.append((None, str(e)))
+            continue
+        decoded.append((decode_image(image_bytes, min_long_side=min_long_side), None))
+    return decoded
+
+
+# -------------------------------------------------
+# Scoring
+# -------------------------------------------------
+def score_batch(app, batch, decoded):
+    """Batched YOLO + CLIP for a whole batch, then the per-report decision"""
+    texts = [item["text"].strip() for item in batch]
+    hits = [app.text_matcher.scan(text) for text in texts]
+    images = [image for image, _ in decoded]
+    ok = [i for i, image in enumerate(images) if image is not None]
+
+    detected = [None] * len(batch)
+    escalated = [False] * len(batch)
+    clip_scores = [None] * len(batch)
+    if ok:
+        bgr = [images[i].bgr for i in ok]
+        if app.YOLO_CASCADE:
+            resolved = [app.resolve_lowres_detections(c) for c in app._yolo_lowres_batch(bgr)]
+            redo = [j for j, (_, ambiguous) in enumerate(resolved) if ambiguous]
+            full = dict(zip(redo, app._yolo_batch([bgr[j] for j in redo]) if redo else []))
+            for j, i in enumerate(ok):
+                detected[i] = full.get(j, resolved[j][0])
+                escalated[i] = j in full
+        else:
+            for i, objects in zip(ok, app._yolo_batch(bgr)):
+                detected[i] = objects
+
+        image_embeddings = app.clip_scorer.encode_images([images[i].rgb for i in ok])
+        text_embeddings = app.encode_descriptions([texts[i] for i in ok])
+        for j, i in enumerate(ok):
+            desc, prompts = app.clip_scorer.score(image_embeddings[j], text_embeddings[j])
+            clip_scores[i] = (
+                desc, prompts[app.CIVIC_CLIP_PROMPT], prompts[app.NON_CIVIC_PROMPT]
+            )
+
+    urgencies = [None] * len(batch)
+    if app.lexicon_urgency_scorer is not None:
+        urgencies = [float(u) for u in app.lexicon_urgency_scorer.score_batch(texts)]
+
+    rows = []
+    for i, item in enumerate(batch):
+        row = dict.fromkeys(COLUMNS)
+        row.update(id=item["id"], image=item["image"])
+        image, error = decoded[i]
+        if error is not None:
+            row.update(status="error", message=error)
+            rows.append(row)
+            continue
+
+        ctx = app.ValidationContext(None, texts[i], hits[i], decoded=image)
+        ctx.detected, ctx.yolo_escalated = detected[i], escalated[i]
+        if clip_scores[i] is not None:
+            ctx.desc_similarity, ctx.civic_similarity, ctx.noncivic_similarity = clip_scores[i]
+        body, status_code = app.analyze_context(ctx, texts[i], urgencies[i])
+        analysis = body.get("analysis", {})
+
+        row.update(
+            status="accepted" if status_code == 200 else "rejected",
+            reason_code=ctx.rejection_code,
+            message=body.get("message") or analysis.get("verification_reason"),
+            detected_objects=sorted(detected[i] or ()),
+            yolo_escalated=escalated[i],
+            civic_keywords=hits[i].group("civic"),
+            priority=analysis.get("priority"),
+            urgency=analysis.get("urgency"),
+            verification_score=analysis.get("verification_score"),
+            is_dangerous=analysis.get("is_dangerous"),
+            danger_type=analysis.get("danger_type"),
+        )
+        if clip_scores[i] is not None:
+            row.update(zip(("desc_similarity", "civic_similarity", "noncivic_similarity"), clip_scores[i]))
+        rows.append(row)
+    return rows
+
+
+# -------------------------------------------------
+# Output (doubles as the checkpoint)
+# -------------------------------------------------
+class JsonlOutput:
+    def __init__(self, path):
+        self.path = path
+
+    def completed_ids(self):
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            # Drop a line cut off by an interrupted run
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                f.truncate(end)
+        return {json.loads(line)["id"] for line in data[:end].splitlines() if line.strip()}
+
+    def open(self):
+        self._file = open(self.path, "a")
+
+    def write(self, rows):
+        self._file.write("".join(json.dumps(row) + "\n" for row in rows))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    def __init__(self, path, rows_per_part):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self.schema = pa.schema([
+            ("id", pa.string()), ("image", pa.string()), ("status", pa.string()),
+            ("reason_code", pa.string()), ("message", pa.string()),
+            ("desc_similarity", pa.float32()), ("civic_similarity", pa.float32()),
+            ("noncivic_similarity", pa.float32()),
+            ("detected_objects", pa.list_(pa.string())), ("yolo_escalated", pa.bool_()),
+            ("civic_keywords", pa.list_(pa.string())),
+            ("priority", pa.string()), ("urgency", pa.float32()),
+            ("verification_score", pa.int32()), ("is_dangerous", pa.bool_()),
+            ("danger_type", pa.string()),
+        ])
+        self._buffer = []
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def completed_ids(self):
+        ids = set()
+        for part in self._parts():
+            ids.update(self.pq.read_table(part, columns=["id"]).column("id").to_pylist())
+        return ids
+
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._next_part = len(self._parts())
+
+    def _write_part(self):
+        table = self.pa.Table.from_pylist(self._buffer, schema=self.schema)
+        final = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        # Write then rename, so a part file is either complete or absent
+        self.pq.write_table(table, final + ".tmp")
+        os.replace(final + ".tmp", final)
+        self._next_part += 1
+        self._buffer = []
+
+    def write(self, rows):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.rows_per_part:
+            self._write_part()
+
+    def close(self):
+        if self._buffer:
+            self._write_part()
+
+
+# -------------------------------------------------
+# Main
+# -------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="JSONL of {id, image, text}")
+    source.add_argument("--images", help="directory of images (all scored against --text)")
+    parser.add_argument("--text", default="", help="description used with --images")
+    parser.add_argument("--image-root", help="base for relative manifest paths")
+    parser.add_argument("--output", required=True, help="*.jsonl, or *.parquet (directory)")
+    parser.add_argument("--resume", action="store_true", help="skip ids already in --output")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="decode processes (0 = decode in the main process)")
+    parser.add_argument("--prefetch", type=int, default=4, help="decoded batches kept ready")
+    parser.add_argument("--checkpoint-every", type=int, default=1000,
+                        help="rows per Parquet part file")
+    parser.add_argument("--limit", type=int, help="stop after this many reports")
+    parser.add_argument("--score-log", help="also append raw signals to this score log")
+    args = parser.parse_args()
+
+    if args.output.endswith(".parquet"):
+        output = ParquetOutput(args.output, args.checkpoint_every)
+    else:
+        output = JsonlOutput(args.output)
+
+    if os.path.exists(args.output) and not args.resume:
+        print(f"{args.output} already exists; pass --resume to continue it")
+        return 1
+    done = output.completed_ids() if args.resume else set()
+    if done:
+        print(f"Resuming: {len(done)} reports already scored")
+
+    if args.manifest:
+        image_root = args.image_root or os.path.dirname(os.path.abspath(args.manifest))
+        items = iter_manifest(args.manifest, image_root)
+    else:
+        items = iter_image_dir(args.images, args.text)
+    items = (item for item in items if item["id"] not in done)
+    if args.limit:
+        items = (item for _, item in zip(range(args.limit), items))
+
+    if args.score_log:
+        os.environ["SCORE_LOG"] = "true"
+        os.environ["SCORE_LOG_DIR"] = args.score_log
+    import app
+    app.load_models()
+    if app.model_state["status"] == "failed":
+        return 1
+    min_long_side = app.YOLO_MIN_LONG_SIDE if app.IMAGE_DECODE_DOWNSCALE else 0
+
+    totals = Counter()
+    start = time.perf_counter()
+
+    def consume(batch, decoded):
+        rows = score_batch(app, batch, decoded)
+        output.write(rows)
+        totals.update(row["reason_code"] or row["status"] for row in rows)
+        scored = sum(totals.values())
+        rate = scored / (time.perf_counter() - start)
+        print(f"{scored} scored ({rate:.1f}/s) {dict(totals)}", flush=True)
+
+    output.open()
+    try:
+        if args.workers == 0:
+            for batch in chunked(items, args.batch_size):
+                consume(batch, decode_batch(batch, min_long_side))
+        else:
+            # spawn: forking a process that already runs torch threads can hang
+            with ProcessPoolExecutor(
+                args.workers, mp_context=get_context("spawn"), initializer=_init_worker
+            ) as pool:
+                window = deque()
+                for batch in chunked(items, args.batch_size):
+                    window.append((batch, pool.submit(decode_batch, batch, min_long_side)))
+                    if len(window) > args.prefetch:
+                        batch, future = window.popleft()
+                        consume(batch, future.result())
+                while window:
+                    batch, future = window.popleft()
+                    consume(batch, future.result())
+    finally:
+        output.close()
+
+    print(f"\nDone: {sum(totals.values())} reports in {time.perf_counter() - start:.1f}s")
+    print(json.dumps(dict(totals), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
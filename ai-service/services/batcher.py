@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+# -------------------------------------------------
+# Dynamic Micro-Batching Scheduler
+# -------------------------------------------------
+class MicroBatcher:
+    """
+    Collects items submitted from concurrent request threads and runs them
+    through `process_batch` together.
+
+    A batch is dispatched when `max_batch_size` items are waiting or
+    `max_wait_ms` has passed since the first item arrived, whichever comes
+    first. `process_batch` takes a list of items and must return a list of
+    results in the same order.
+    """
+
+    def __init__(self, name, process_batch, max_batch_size=8, max_wait_ms=10):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+        # Statistics
+        self._max_queue_depth = 0
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+
+    # ---- public API ----
+    def submit(self, item):
+        """Queue one item; returns a Future resolved with its result"""
+        future = Future()
+        if self.max_batch_size == 1:
+            # Batching disabled: run inline on the caller's thread
+            self._dispatch([(item, future)])
+            return future
+
+        self._ensure_worker()
+        self._queue.put((item, future))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return future
+
+    def run(self, item):
+        """Submit one item and block until its result is ready"""
+        return self.submit(item).result()
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self._max_queue_depth,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0,
+            "largest_batch": self._largest_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0
+        }
+
+    # ---- worker ----
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._loop,
+                    name=f"batcher-{self.name}",
+                    daemon=True
+                )
+                self._worker.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        # Deadline passed: still take whatever is already queued
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        self._batches += 1
+        self._items += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+
+        try:
+            results = self.process_batch(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: got {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad input must not fail its neighbours: retry one by one
+            print(f"Batch error in {self.name} ({e}), retrying items individually")
+            for item, future in batch:
+                try:
+                    future.set_result(self.process_batch([item])[0])
+                except Exception as item_error:
+                    future.set_exception(item_error)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
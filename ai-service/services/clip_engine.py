@@ -0,0 +1,69 @@
+import torch
+
+
+# -------------------------------------------------
+# CLIP Scoring Engine
+# -------------------------------------------------
+class ClipScorer:
+    """
+    Scores one image against several texts with a single vision pass.
+
+    Fixed prompts (civic / non-civic) are encoded once at startup and kept
+    as a normalized (P, D) matrix, so per request we only pay for one
+    image encoding and one encoding of the user description.
+    """
+
+    def __init__(self, model, processor, device, prompts=()):
+        self.model = model
+        self.processor = processor
+        self.device = device
+        self.prompts = list(prompts)
+        self.prompt_embeddings = (
+            self.encode_texts(self.prompts) if self.prompts else None
+        )
+
+    @staticmethod
+    def _normalize(features):
+        return features / features.norm(dim=-1, keepdim=True)
+
+    def encode_images(self, images):
+        """Return normalized image embeddings, shape (N, D)"""
+        inputs = self.processor(images=images, return_tensors="pt").to(self.device)
+        with torch.inference_mode():
+            features = self.model.get_image_features(
+                pixel_values=inputs["pixel_values"]
+            )
+        return self._normalize(features)
+
+    def encode_texts(self, texts):
+        """Return normalized text embeddings, shape (N, D)"""
+        inputs = self.processor(
+            text=list(texts),
+            return_tensors="pt",
+            padding=True
+        ).to(self.device)
+        with torch.inference_mode():
+            features = self.model.get_text_features(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"]
+            )
+        return self._normalize(features)
+
+    def score(self, image_embedding, text_embedding=None):
+        """
+        Cosine similarity of one image embedding against an optional
+        pre-encoded user text followed by every fixed prompt, in a single
+        matmul.
+
+        Returns (text_score, {prompt: score}).
+        """
+        rows = [self.prompt_embeddings] if self.prompt_embeddings is not None else []
+        if text_embedding is not None:
+            rows.insert(0, text_embedding.reshape(1, -1))
+        text_matrix = torch.cat(rows, dim=0)
+
+        with torch.inference_mode():
+            scores = (image_embedding.reshape(1, -1) @ text_matrix.T).squeeze(0).tolist()
+
+        text_score = scores.pop(0) if text_embedding is not None else None
+        return text_score, dict(zip(self.prompts, scores))
@@ -0,0 +1,182 @@
+import gc
+import threading
+import time
+
+import numpy as np
+import torch
+
+from services.metrics import resident_memory_bytes
+
+
+# -------------------------------------------------
+# Memory-Lean CLIP (reduced precision, separate towers)
+# -------------------------------------------------
+# Selected with CLIP_PRECISION=bf16|fp16 and/or CLIP_TEXT_TOWER=on_demand.
+# Instead of the full fp32 CLIPModel, the vision and text towers are loaded
+# separately (CLIP*ModelWithProjection), in the requested dtype, and the
+# text tower can be dropped once the fixed prompts are encoded.
+PRECISIONS = {
+    "fp32": torch.float32,
+    "bf16": torch.bfloat16,
+    "fp16": torch.float16,
+}
+
+
+def resident_mb():
+    """Resident set size of this process in MB"""
+    return round(resident_memory_bytes() / 1024 / 1024, 1)
+
+
+def parameter_mb(module):
+    if module is None:
+        return 0.0
+    return round(sum(p.numel() * p.element_size() for p in module.parameters()) / 1024 / 1024, 1)
+
+
+class LeanClipModel:
+    """
+    Drop-in for the CLIPModel methods ClipScorer uses
+    (get_image_features / get_text_features).
+
+    Inputs are cast to the model dtype and features are returned as
+    float32, so everything downstream (scoring, the embedding index) is
+    unchanged. With `text_on_demand`, release_text_tower() frees the text
+    tower; it is reloaded on the next cache-missing description and
+    released again after `idle_seconds` without use.
+    """
+
+    def __init__(self, model_name, device, precision="bf16",
+                 text_on_demand=False, idle_seconds=300):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown CLIP precision {precision!r} (expected one of {sorted(PRECISIONS)})")
+        self.model_name = model_name
+        self.device = device
+        self.precision = precision
+        self.dtype = PRECISIONS[precision]
+        self.text_on_demand = text_on_demand
+        self.idle_seconds = idle_seconds
+
+        self._text_lock = threading.Lock()
+        self._text_last_used = 0.0
+        self._reaper = None
+        self.text_loads = 0
+        self.text_releases = 0
+
+        self.vision = self._load("vision")
+        self.text = self._load("text")
+
+    def _load(self, tower):
+        from transformers import CLIPTextModelWithProjection, CLIPVisionModelWithProjection
+
+        cls = CLIPVisionModelWithProjection if tower == "vision" else CLIPTextModelWithProjection
+        model = cls.from_pretrained(
+            self.model_name, torch_dtype=self.dtype, low_cpu_mem_usage=True
+        )
+        return model.to(self.device).eval()
+
+    # ---- CLIPModel interface ----
+    def get_image_features(self, pixel_values):
+        with torch.inference_mode():
+            output = self.vision(pixel_values=pixel_values.to(self.dtype))
+        return output.image_embeds.float()
+
+    def get_text_features(self, input_ids, attention_mask):
+        with self._text_lock:
+            if self.text is None:
+                self.text = self._load("text")
+                self.text_loads += 1
+            self._text_last_used = time.monotonic()
+            with torch.inference_mode():
+                output = self.text(input_ids=input_ids, attention_mask=attention_mask)
+        if self.text_on_demand:
+            self._ensure_reaper()
+        return output.text_embeds.float()
+
+    # ---- text tower lifetime ----
+    def release_text_tower(self):
+        with self._text_lock:
+            if self.text is None:
+                return
+            self.text = None
+            self.text_releases += 1
+        gc.collect()
+
+    def _ensure_reaper(self):
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper = threading.Thread(target=self._reap, name="clip-text-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        while True:
+            with self._text_lock:
+                if self.text is None:
+                    return
+                idle = time.monotonic() - self._text_last_used
+            if idle >= self.idle_seconds:
+                self.release_text_tower()
+                return
+            time.sleep(min(self.idle_seconds - idle, 60) + 0.1)
+
+    def stats(self):
+        return {
+            "precision": self.precision,
+            "text_tower": "on_demand" if self.text_on_demand else "resident",
+            "text_tower_loaded": self.text is not None,
+            "text_tower_loads": self.text_loads,
+            "text_tower_releases": self.text_releases,
+            "vision_params_mb": parameter_mb(self.vision),
+            "text_params_mb": parameter_mb(self.text),
+        }
+
+
+# -------------------------------------------------
+# Score Drift Against fp32
+# -------------------------------------------------
+def probe_images(count=4, size=224, seed=0):
+    """Deterministic RGB test images (noise over flat road-grey)"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        image = np.full((size, size, 3), rng.integers(60, 180), np.uint8)
+        image += rng.integers(0, 60, (size, size, 3), dtype=np.uint8)
+        images.append(image)
+    return images
+
+
+def probe_scores(scorer, texts, images):
+    """Cosine scores of `scorer` on probe images x texts"""
+    return (scorer.encode_images(images) @ scorer.encode_texts(texts).T).float().cpu()
+
+
+def measure_drift(lean_scores, processor, model_name, texts, images):
+    """
+    Compare probe_scores() of the lean model with the fp32 towers on the
+    same images x texts. The fp32 towers are loaded one at a time and
+    freed straight away to keep the peak low.
+    """
+    from transformers import CLIPTextModelWithProjection, CLIPVisionModelWithProjection
+
+    pixel_values = processor(images=images, return_tensors="pt")["pixel_values"]
+    tokens = processor(text=list(texts), return_tensors="pt", padding=True)
+    with torch.inference_mode():
+        vision = CLIPVisionModelWithProjection.from_pretrained(model_name).eval()
+        image_embeds = vision(pixel_values=pixel_values).image_embeds
+        del vision
+        gc.collect()
+        text = CLIPTextModelWithProjection.from_pretrained(model_name).eval()
+        text_embeds = text(
+            input_ids=tokens["input_ids"], attention_mask=tokens["attention_mask"]
+        ).text_embeds
+        del text
+        gc.collect()
+        image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+        text_embeds = text_embeds / text_embeds.norm(dim=-1, keepdim=True)
+        reference = image_embeds @ text_embeds.T
+
+    diff = (lean_scores - reference).abs()
+    return {
+        "samples": diff.numel(),
+        "max_abs": round(float(diff.max()), 5),
+        "mean_abs": round(float(diff.mean()), 5),
+    }
@@ -0,0 +1,348 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from itertools import chain
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:   # Windows: single-process use only
+    fcntl = None
+
+
+# -------------------------------------------------
+# Geohash
+# -------------------------------------------------
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6371000.0
+
+
+def geohash(lat, lon, precision=6):
+    """Standard base32 geohash of a point"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, value, bits, even = [], 0, 0, True
+    while len(chars) < precision:
+        span, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (span[0] + span[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            span[0] = mid
+        else:
+            value <<= 1
+            span[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            value = bits = 0
+    return "".join(chars)
+
+
+def _steps(lo, hi, step):
+    return list(np.arange(lo, hi, step)) + [hi]
+
+
+def geohash_cells(lat, lon, radius_m, precision, max_cells=64):
+    """
+    Geohash cells overlapping the bounding box of a circle, or None when
+    that takes more than `max_cells` (the caller should scan everything).
+    """
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    cell_height = 180.0 / 2 ** lat_bits
+    cell_width = 360.0 / 2 ** lon_bits
+
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    lats = _steps(max(lat - dlat, -90.0), min(lat + dlat, 90.0), cell_height)
+    lons = _steps(lon - dlon, lon + dlon, cell_width)
+    if len(lats) * len(lons) > max_cells:
+        return None
+    return {
+        geohash(a, (o + 180.0) % 360.0 - 180.0, precision)
+        for a in lats for o in lons
+    }
+
+
+def haversine_m(lat, lon, lats, lons):
+    """Distance in metres from one point to arrays of points (NaN stays NaN)"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# -------------------------------------------------
+# Image Embedding Index
+# -------------------------------------------------
+META_DTYPE = np.dtype([
+    ("id", "S36"),
+    ("lat", "<f8"),
+    ("lon", "<f8"),
+    ("created", "<f8"),
+])
+_VERSION = 1
+_HEADER = ("version", "dim", "capacity", "count")
+
+
+class EmbeddingIndex:
+    """
+    Fixed-capacity ring buffer of normalized float16 embeddings with
+    id / location / timestamp metadata; once full, the oldest entry is
+    overwritten.
+
+    With `path`, the matrix, the metadata and a small header live in
+    memory-mapped files under that directory, so the index survives
+    restarts and is shared by every process (gunicorn workers) that opens
+    it: writers take an flock, and each process catches up on entries
+    added by the others before it answers a query.
+
+    With `geohash_precision` > 0, entries are bucketed by geohash cell and
+    a radius query only scores the cells its bounding box touches.
+    """
+
+    def __init__(self, dim, capacity=100000, path=None, geohash_precision=6):
+        self.dim = dim
+        self.capacity = capacity
+        self.path = path
+        self.geohash_precision = geohash_precision
+
+        self._lock = threading.Lock()
+        self._slots = {}        # id -> slot
+        self._slot_ids = {}     # slot -> id
+        self._cells = {}        # geohash -> {slot}
+        self._slot_cells = {}   # slot -> geohash
+        self._live = np.zeros(capacity, bool)
+        self._synced = 0        # header count already reflected above
+
+        self.adds = 0
+        self.queries = 0
+
+        if path:
+            self._open(path)
+        else:
+            self._embeddings = np.zeros((capacity, dim), np.float16)
+            self._meta = np.zeros(capacity, META_DTYPE)
+            self._header = np.array([_VERSION, dim, capacity, 0], np.int64)
+
+        with self._lock:
+            self._sync()
+
+    # ---- storage ----
+    def _open(self, path):
+        os.makedirs(path, exist_ok=True)
+        files = {
+            name: os.path.join(path, name)
+            for name in ("header.i64", "embeddings.f16", "meta.dat")
+        }
+        with self._file_lock():
+            fresh = not all(os.path.exists(f) for f in files.values())
+            if not fresh:
+                header = np.memmap(files["header.i64"], np.int64, "r+", shape=(len(_HEADER),))
+                if tuple(header[:3]) != (_VERSION, self.dim, self.capacity):
+                    print(f"Embedding index at {path} has a different layout; starting a new one")
+                    fresh = True
+            mode = "w+" if fresh else "r+"
+            self._embeddings = np.memmap(
+                files["embeddings.f16"], np.float16, mode, shape=(self.capacity, self.dim)
+            )
+            self._meta = np.memmap(files["meta.dat"], META_DTYPE, mode, shape=(self.capacity,))
+            if fresh:
+                header = np.memmap(files["header.i64"], np.int64, "w+", shape=(len(_HEADER),))
+                header[:] = (_VERSION, self.dim, self.capacity, 0)
+                header.flush()
+            self._header = header
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        if not self.path or fcntl is None:
+            yield
+            return
+        # A fresh open per call: flock on an fd inherited across fork would
+        # not exclude the parent from its children
+        with open(os.path.join(self.path, "index.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+
+    @property
+    def count(self):
+        """Entries ever added (the newest `capacity` of them are kept)"""
+        return int(self._header[3])
+
+    def flush(self):
+        for array in (self._embeddings, self._meta, self._header):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    # ---- in-process lookup tables ----
+    def _forget(self, slot):
+        if not self._live[slot]:
+            return
+        self._live[slot] = False
+        item_id = self._slot_ids.pop(slot)
+        if self._slots.get(item_id) == slot:
+            del self._slots[item_id]
+        cell = self._slot_cells.pop(slot, None)
+        if cell is not None:
+            members = self._cells[cell]
+            members.discard(slot)
+            if not members:
+                del self._cells[cell]
+
+    def _sync(self):
+        """Index entries added since the last call (by any process)"""
+        count = self.count
+        if count == self._synced:
+            return
+        if count < self._synced or count - self._synced > self.capacity:
+            # Recreated underneath us, or lapped: rebuild from scratch
+            self._slots, self._slot_ids, self._cells, self._slot_cells = {}, {}, {}, {}
+            self._live[:] = False
+            self._synced = max(0, count - self.capacity)
+
+        for n in range(self._synced, count):
+            slot = n % self.capacity
+            self._forget(slot)
+            record = self._meta[slot]
+            item_id = record["id"].decode()
+            previous = self._slots.get(item_id)
+            if previous is not None:
+                self._forget(previous)   # re-added id: newest entry wins
+            self._slots[item_id] = slot
+            self._slot_ids[slot] = item_id
+            self._live[slot] = True
+            lat, lon = float(record["lat"]), float(record["lon"])
+            if self.geohash_precision and not (math.isnan(lat) or math.isnan(lon)):
+                cell = geohash(lat, lon, self.geohash_precision)
+                self._cells.setdefault(cell, set()).add(slot)
+                self._slot_cells[slot] = cell
+        self._synced = count
+
+    # ---- public API ----
+    def _normalized(self, embedding):
+        vector = np.asarray(embedding, np.float32).reshape(-1)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-d embedding, got {vector.shape[0]}")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, item_id, embedding, lat=None, lon=None, created=None):
+        key = str(item_id).encode()
+        if not key or len(key) > META_DTYPE["id"].itemsize:
+            raise ValueError(f"Index ids must be 1-{META_DTYPE['id'].itemsize} bytes")
+        vector = self._normalized(embedding)
+
+        with self._lock, self._file_lock():
+            count = self.count
+            slot = count % self.capacity
+            self._embeddings[slot] = vector
+            self._meta[slot] = (
+                key,
+                np.nan if lat is None else lat,
+                np.nan if lon is None else lon,
+                time.time() if created is None else created,
+            )
+            # Publish the row only after it is fully written
+            self._header[3] = count + 1
+            self._sync()
+            self.adds += 1
+
+    def get(self, item_id):
+        """(embedding, lat, lon) of an indexed entry, or None"""
+        with self._lock, self._file_lock(shared=True):
+            self._sync()
+            slot = self._slots.get(str(item_id))
+            if slot is None:
+                return None
+            record = self._meta[slot]
+            lat, lon = float(record["lat"]), float(record["lon"])
+            return (
+                self._embeddings[slot].astype(np.float32),
+                None if math.isnan(lat) else lat,
+                None if math.isnan(lon) else lon,
+            )
+
+    def query(self, embedding, lat=None, lon=None, radius_m=None, k=5,
+              max_age_seconds=None, min_similarity=None, exclude_id=None):
+        """
+        Top-k entries by cosine similarity, optionally limited to
+        `radius_m` around (lat, lon) and to the last `max_age_seconds`.
+        Returns a list of dicts, most similar first.
+        """
+        vector = self._normalized(embedding)
+        geo = lat is not None and lon is not None and radius_m is not None
+
+        with self._lock, self._file_lock(shared=True):
+            self._sync()
+            self.queries += 1
+            candidates = None
+            if geo and self.geohash_precision:
+                cells = geohash_cells(lat, lon, radius_m, self.geohash_precision)
+                if cells is not None:
+                    candidates = np.fromiter(
+                        chain.from_iterable(self._cells.get(c, ()) for c in cells), np.int64
+                    )
+                    candidates.sort()
+            if candidates is None:
+                candidates = np.flatnonzero(self._live)
+            if not len(candidates):
+                return []
+
+            meta = self._meta[candidates]
+            keep = np.ones(len(candidates), bool)
+            if max_age_seconds is not None:
+                keep &= meta["created"] >= time.time() - max_age_seconds
+            if exclude_id is not None:
+                keep &= meta["id"] != str(exclude_id).encode()
+            distances = None
+            if geo:
+                distances = haversine_m(lat, lon, meta["lat"], meta["lon"])
+                keep &= distances <= radius_m   # entries without a location drop out
+            candidates, meta = candidates[keep], meta[keep]
+            if distances is not None:
+                distances = distances[keep]
+            scores = self._embeddings[candidates].astype(np.float32) @ vector
+
+        if min_similarity is not None:
+            passing = scores >= min_similarity
+            candidates, meta, scores = candidates[passing], meta[passing], scores[passing]
+            if distances is not None:
+                distances = distances[passing]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            record = meta[i]
+            results.append({
+                "id": record["id"].decode(),
+                "similarity": round(float(scores[i]), 4),
+                "distance_m": None if distances is None else round(float(distances[i]), 1),
+                "latitude": None if math.isnan(record["lat"]) else float(record["lat"]),
+                "longitude": None if math.isnan(record["lon"]) else float(record["lon"]),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(record["created"])),
+            })
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._slots),
+                "capacity": self.capacity,
+                "dim": self.dim,
+                "geohash_precision": self.geohash_precision,
+                "cells": len(self._cells),
+                "persistent": bool(self.path),
+                "matrix_mb": round(self._embeddings.nbytes / 1e6, 1),
+                "adds": self.adds,
+                "queries": self.queries,
+            }
@@ -0,0 +1,90 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# -------------------------------------------------
+# Bounded Inference Pool with Admission Control
+# -------------------------------------------------
+class PoolFullError(Exception):
+    """Raised when the pool already holds its maximum number of tasks"""
+
+    def __init__(self, retry_after):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """
+    Thread pool for model work that admits at most
+    `max_workers + max_queue` tasks at a time. Beyond that, `submit`
+    raises PoolFullError carrying a Retry-After estimate (seconds) derived
+    from recent task durations, instead of letting the backlog grow.
+
+    Threads suit us here: torch and OpenCV release the GIL during
+    inference, and the models stay shared in one process.
+    """
+
+    def __init__(self, max_workers=4, max_queue=32):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.capacity = self.max_workers + self.max_queue
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference"
+        )
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._avg_task_seconds = 1.0   # EWMA, seeded with a conservative guess
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PoolFullError(self.retry_after())
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._executor.submit(self._run, fn, args, kwargs)
+        except Exception:
+            self._release()
+            raise
+
+    def retry_after(self):
+        """Seconds until roughly one queue's worth of work has drained"""
+        waves = self.capacity / self.max_workers
+        return max(1, math.ceil(waves * self._avg_task_seconds))
+
+    def stats(self):
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.max_workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_task_ms": round(self._avg_task_seconds * 1000, 1)
+        }
+
+    def _run(self, fn, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._avg_task_seconds = 0.8 * self._avg_task_seconds + 0.2 * elapsed
+                self._completed += 1
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
@@ -0,0 +1,234 @@
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+
+# -------------------------------------------------
+# Asynchronous Analysis Jobs
+# -------------------------------------------------
+class JobQueueFull(Exception):
+    """Raised when the queue already holds its maximum number of jobs"""
+
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass   # exists, owned by someone else
+    return True
+
+
+class JobQueue:
+    """
+    Bounded priority queue of analysis jobs, run by `workers` background
+    threads. Urgent jobs are taken before every normal job; within a class
+    jobs run in submission order.
+
+    Job records (status, then the result) are kept for
+    `result_ttl_seconds` after the job finishes. With `path`, each record
+    is also written to `<path>/<job_id>.json`, so any process sharing the
+    directory (every gunicorn worker) can answer a poll, not only the one
+    that accepted the job.
+    """
+
+    def __init__(self, run, workers=2, max_pending=256, result_ttl_seconds=3600, path=None):
+        self.run = run
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.result_ttl_seconds = result_ttl_seconds
+        self.path = path
+
+        self._heap = []               # (class, seq, job_id, args)
+        self._seq = itertools.count()
+        self._jobs = {}               # job_id -> record (this process)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._last_sweep = 0.0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._avg_job_seconds = 1.0   # EWMA, seeded with a conservative guess
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    # ---- public API ----
+    def submit(self, args, urgent=False, priority=None):
+        """Queue run(*args); returns the job record. Raises JobQueueFull."""
+        with self._cond:
+            if len(self._heap) >= self.max_pending:
+                self.rejected += 1
+                raise JobQueueFull(self._retry_after())
+            job_id = uuid.uuid4().hex
+            record = {
+                "job_id": job_id,
+                "status": "queued",
+                "priority": priority,
+                "urgent": urgent,
+                "created_at": time.time(),
+                "pid": os.getpid(),
+            }
+            self._jobs[job_id] = record
+            self._save(record)
+            accepted = dict(record)   # a worker may update `record` once we notify
+            heapq.heappush(self._heap, (0 if urgent else 1, next(self._seq), job_id, args))
+            self.submitted += 1
+            self._ensure_workers()
+            self._cond.notify()
+        self._sweep()
+        return accepted
+
+    def get(self, job_id):
+        """Job record (with `queue_position` while queued), or None"""
+        with self._cond:
+            record = self._jobs.get(job_id)
+            if record is not None:
+                record = dict(record)
+                if record["status"] == "queued":
+                    key = next(entry[:2] for entry in self._heap if entry[2] == job_id)
+                    record["queue_position"] = 1 + sum(1 for entry in self._heap if entry[:2] < key)
+        if record is None:
+            record = self._load(job_id)
+            if record is None:
+                return None
+            if record["status"] in ("queued", "running") and not _pid_alive(record["pid"]):
+                # Accepted by a worker process that has since died
+                record.update(status="failed", error="worker restarted before the job finished")
+        if record.get("expires_at") is not None and record["expires_at"] < time.time():
+            return None
+        return record
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": len(self._heap),
+            "urgent_pending": sum(1 for entry in self._heap if entry[0] == 0),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_job_ms": round(self._avg_job_seconds * 1000, 1),
+            "result_ttl_seconds": self.result_ttl_seconds,
+            "shared": bool(self.path),
+        }
+
+    # ---- workers ----
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._loop,
+                name=f"analysis-job-{len(self._threads)}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job_id, args = heapq.heappop(self._heap)
+                record = self._jobs[job_id]
+                record.update(status="running", started_at=time.time())
+                self._save(record)
+
+            start = time.perf_counter()
+            try:
+                body, status_code = self.run(*args)
+                update = {"status": "done", "http_status": status_code, "result": body}
+            except Exception as e:
+                print(f"Analysis job {job_id} failed: {e}")
+                update = {"status": "failed", "error": str(e)}
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                finished = time.time()
+                record.update(
+                    update,
+                    finished_at=finished,
+                    expires_at=finished + self.result_ttl_seconds
+                )
+                self._save(record)
+                if update["status"] == "done":
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+            args = None   # drop the image bytes before waiting for the next job
+            self._sweep()
+
+    def _retry_after(self):
+        """Seconds until roughly one queue's worth of jobs has drained"""
+        return max(1, math.ceil(len(self._heap) / self.workers * self._avg_job_seconds))
+
+    # ---- storage ----
+    def _file(self, job_id):
+        return os.path.join(self.path, f"{job_id}.json")
+
+    def _save(self, record):
+        if not self.path:
+            return
+        tmp = f"{self._file(record['job_id'])}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp, self._file(record["job_id"]))
+
+    def _load(self, job_id):
+        if not self.path or len(job_id) != 32 or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        try:
+            with open(self._file(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _sweep(self, interval=60):
+        """Forget finished jobs past their TTL (at most once per `interval`)"""
+        now = time.time()
+        if now - self._last_sweep < interval:
+            return
+        self._last_sweep = now
+        with self._cond:
+            for job_id in [
+                job_id for job_id, record in self._jobs.items()
+                if record.get("expires_at") is not None and record["expires_at"] < now
+            ]:
+                del self._jobs[job_id]
+        if not self.path:
+            return
+        cutoff = now - self.result_ttl_seconds
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            try:
+                # Finished records are last written when the job completes
+                if os.path.getmtime(path) < cutoff and self._expired(path, now):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _expired(path, now):
+        try:
+            with open(path) as f:
+                record = json.load(f)
+        except ValueError:
+            return True   # torn temp file of a crashed writer
+        if record.get("expires_at") is not None:
+            return record["expires_at"] < now
+        return not _pid_alive(record["pid"])
@@ -0,0 +1,175 @@
+import os
+import shutil
+
+import numpy as np
+import torch
+
+
+# -------------------------------------------------
+# ONNX Runtime Inference Backend (CPU)
+# -------------------------------------------------
+# Selected with INFERENCE_BACKEND=onnx. Both models are exported once to
+# ONNX_MODEL_DIR (optionally with dynamic int8 weight quantization) and
+# then served by ONNX Runtime instead of eager PyTorch.
+CLIP_VISION_FILE = "clip_vision.onnx"
+CLIP_TEXT_FILE = "clip_text.onnx"
+YOLO_FILE = "yolov8n.onnx"
+ONNX_OPSET = 17
+
+
+def _quantized_name(filename):
+    root, ext = os.path.splitext(filename)
+    return f"{root}_int8{ext}"
+
+
+def _quantize(src, dst):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    return dst
+
+
+# -------------------------------------------------
+# Export
+# -------------------------------------------------
+class _ClipVisionTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+
+class _ClipTextTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model.get_text_features(
+            input_ids=input_ids,
+            attention_mask=attention_mask
+        )
+
+
+def export_clip(clip_model, model_dir, quantize=False):
+    """Export CLIP's vision and text towers as two ONNX graphs"""
+    os.makedirs(model_dir, exist_ok=True)
+    clip_model = clip_model.to("cpu").eval()
+    vision_path = os.path.join(model_dir, CLIP_VISION_FILE)
+    text_path = os.path.join(model_dir, CLIP_TEXT_FILE)
+    image_size = clip_model.config.vision_config.image_size
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _ClipVisionTower(clip_model),
+            (torch.zeros(1, 3, image_size, image_size),),
+            vision_path,
+            input_names=["pixel_values"],
+            output_names=["image_embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+            opset_version=ONNX_OPSET,
+            dynamo=False
+        )
+        torch.onnx.export(
+            _ClipTextTower(clip_model),
+            (
+                torch.ones(1, 8, dtype=torch.long),
+                torch.ones(1, 8, dtype=torch.long)
+            ),
+            text_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["text_embeds"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "text_embeds": {0: "batch"}
+            },
+            opset_version=ONNX_OPSET,
+            dynamo=False
+        )
+
+    if quantize:
+        vision_path = _quantize(vision_path, os.path.join(model_dir, _quantized_name(CLIP_VISION_FILE)))
+        text_path = _quantize(text_path, os.path.join(model_dir, _quantized_name(CLIP_TEXT_FILE)))
+    return vision_path, text_path
+
+
+def export_yolo(weights, model_dir, quantize=False):
+    """Export YOLO through ultralytics with a dynamic batch dimension"""
+    from ultralytics import YOLO
+
+    os.makedirs(model_dir, exist_ok=True)
+    exported = YOLO(weights).export(format="onnx", dynamic=True, opset=ONNX_OPSET)
+    path = os.path.join(model_dir, YOLO_FILE)
+    if os.path.abspath(exported) != os.path.abspath(path):
+        shutil.move(exported, path)
+
+    if quantize:
+        path = _quantize(path, os.path.join(model_dir, _quantized_name(YOLO_FILE)))
+    return path
+
+
+# -------------------------------------------------
+# Runtime
+# -------------------------------------------------
+class OnnxClipModel:
+    """
+    Drop-in for the two CLIPModel methods the service uses
+    (get_image_features / get_text_features), backed by ONNX Runtime.
+    Returns torch tensors so ClipScorer works unchanged.
+    """
+
+    def __init__(self, vision_path, text_path, intra_op_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        providers = ["CPUExecutionProvider"]
+
+        self.vision_session = ort.InferenceSession(vision_path, options, providers=providers)
+        self.text_session = ort.InferenceSession(text_path, options, providers=providers)
+        self.vision_path = vision_path
+        self.text_path = text_path
+
+    def get_image_features(self, pixel_values):
+        (embeds,) = self.vision_session.run(
+            None, {"pixel_values": pixel_values.cpu().numpy().astype(np.float32)}
+        )
+        return torch.from_numpy(embeds)
+
+    def get_text_features(self, input_ids, attention_mask):
+        (embeds,) = self.text_session.run(None, {
+            "input_ids": input_ids.cpu().numpy().astype(np.int64),
+            "attention_mask": attention_mask.cpu().numpy().astype(np.int64)
+        })
+        return torch.from_numpy(embeds)
+
+
+def load_onnx_models(model_dir, yolo_weights, clip_name, quantize=False):
+    """
+    Return (yolo_model, clip_model) served by ONNX Runtime, exporting
+    (and quantizing) any graph that is not in model_dir yet.
+    """
+    from transformers import CLIPModel
+    from ultralytics import YOLO
+
+    pick = _quantized_name if quantize else (lambda name: name)
+    vision_path = os.path.join(model_dir, pick(CLIP_VISION_FILE))
+    text_path = os.path.join(model_dir, pick(CLIP_TEXT_FILE))
+    yolo_path = os.path.join(model_dir, pick(YOLO_FILE))
+
+    if not (os.path.exists(vision_path) and os.path.exists(text_path)):
+        print(f"Exporting CLIP to ONNX in {model_dir} (quantize={quantize})...")
+        vision_path, text_path = export_clip(
+            CLIPModel.from_pretrained(clip_name), model_dir, quantize
+        )
+
+    if not os.path.exists(yolo_path):
+        print(f"Exporting YOLO to ONNX in {model_dir} (quantize={quantize})...")
+        yolo_path = export_yolo(yolo_weights, model_dir, quantize)
+
+    return YOLO(yolo_path, task="detect"), OnnxClipModel(vision_path, text_path)
@@ -0,0 +1,276 @@
+import hmac
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import torch
+
+
+# -------------------------------------------------
+# Python Stack Sampler
+# -------------------------------------------------
+class StackSampler:
+    """
+    Samples the Python stacks of a set of threads every `interval` seconds
+    from a background thread and counts them in collapsed ("folded") form,
+    root first, ready for flamegraph.pl / speedscope.
+
+    Unlike cProfile it sees every thread taking part in a request (the
+    inference thread and the micro-batcher threads), at a fixed cost per
+    sample rather than per call.
+    """
+
+    def __init__(self, thread_ids, interval=0.005):
+        self.thread_ids = thread_ids   # callable -> {ident: thread name}
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+    def _sample(self):
+        threads = self.thread_ids()
+        for ident, frame in sys._current_frames().items():
+            name = threads.get(ident)
+            if name is None:
+                continue
+            if frame.f_code.co_name == "wait" and frame.f_back is not None \
+                    and frame.f_back.f_code.co_name == "get":
+                # Helper thread blocked on its empty queue
+                self.stacks[f"{name};(idle)"] += 1
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            labels.append(name)
+            self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# -------------------------------------------------
+# Per-Request Profiler
+# -------------------------------------------------
+def _all_threads_config():
+    """
+    Kineto config that records ops on every thread (model passes run on the
+    micro-batcher threads), or None on torch versions without the option:
+    those only record the thread that started the profiler.
+    """
+    try:
+        return torch._C._profiler._ExperimentalConfig(profile_all_threads=True)
+    except (AttributeError, TypeError):
+        return None
+
+
+TRACE_FILES = ("summary.json", "trace.json", "stacks.folded")
+_PROFILE_ID = re.compile(r"\d{8}-\d{6}-[0-9a-f]{8}")
+
+
+class RequestProfiler:
+    """
+    Opt-in profiling of single requests: a torch profiler trace plus a
+    sampled Python stack profile, written to `<directory>/<profile_id>/`.
+    Only the newest `max_traces` profiles are kept.
+
+    wants() is the only call on the unprofiled path. One request is
+    profiled at a time per process; a request selected while another is
+    being profiled runs unprofiled. Batched model passes may include other
+    requests' items.
+    """
+
+    def __init__(self, directory, enabled=False, sample_rate=0.0, token=None,
+                 header="X-Profile", max_traces=50, stack_interval=0.005,
+                 thread_prefixes=()):
+        self.directory = directory
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.token = token
+        self.header = header
+        self.max_traces = max_traces
+        self.stack_interval = stack_interval
+        self.thread_prefixes = tuple(thread_prefixes)
+        self._busy = threading.Lock()
+        self.profiled = 0
+        self.skipped_busy = 0
+
+    # ---- selection ----
+    def authorized(self, headers):
+        """Header-triggered profiling / trace access (token checked if set)"""
+        value = headers.get(self.header)
+        if value is None:
+            return False
+        return self.token is None or hmac.compare_digest(value, self.token)
+
+    def wants(self, headers):
+        if not self.enabled:
+            return False
+        return self.authorized(headers) or (
+            self.sample_rate > 0 and random.random() < self.sample_rate
+        )
+
+    # ---- profiling ----
+    def _thread_ids(self, request_ident, request_name):
+        """Callable -> the request's thread plus the helper threads alive now"""
+        def thread_ids():
+            threads = {request_ident: request_name}
+            for thread in threading.enumerate():
+                if thread.name.startswith(self.thread_prefixes):
+                    threads[thread.ident] = thread.name
+            return threads
+        return thread_ids
+
+    def run(self, fn, args, meta=None, describe=None):
+        """
+        fn(*args) under the profilers. Returns (result, profile_id);
+        profile_id is None when another profile was in progress.
+        `describe(result)` adds result details (e.g. the status) to the summary.
+        """
+        if not self._busy.acquire(blocking=False):
+            self.skipped_busy += 1
+            return fn(*args), None
+        try:
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+            sampler = StackSampler(
+                self._thread_ids(threading.get_ident(), threading.current_thread().name),
+                self.stack_interval
+            )
+            config = _all_threads_config()
+            with torch.profiler.profile(
+                activities=activities, record_shapes=True, experimental_config=config
+            ) as prof:
+                sampler.start()
+                start = time.perf_counter()
+                try:
+                    result = fn(*args)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    sampler.stop()
+
+            summary = dict(meta or {}, torch_threads="all" if config is not None else "request")
+            if describe is not None:
+                summary.update(describe(result))
+            self._save(profile_id, prof, sampler, summary, elapsed)
+            self.profiled += 1
+            return result, profile_id
+        finally:
+            self._busy.release()
+
+    def _save(self, profile_id, prof, sampler, summary, elapsed):
+        path = os.path.join(self.directory, profile_id)
+        os.makedirs(path)
+        prof.export_chrome_trace(os.path.join(path, "trace.json"))
+        with open(os.path.join(path, "stacks.folded"), "w") as f:
+            f.write(sampler.folded())
+
+        ops = sorted(prof.key_averages(), key=lambda e: e.self_cpu_time_total, reverse=True)
+        summary.update({
+            "profile_id": profile_id,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "pid": os.getpid(),
+            "duration_ms": round(elapsed * 1000, 1),
+            "torch_ops": [
+                {
+                    "name": e.key,
+                    "calls": e.count,
+                    "self_cpu_ms": round(e.self_cpu_time_total / 1000, 3),
+                    "cpu_total_ms": round(e.cpu_time_total / 1000, 3),
+                }
+                for e in ops[:25]
+            ],
+            "stack_samples": sampler.samples,
+            "stack_interval_ms": self.stack_interval * 1000,
+            "top_stacks": [
+                {"stack": stack, "samples": count}
+                for stack, count in sampler.stacks.most_common(10)
+            ],
+        })
+        with open(os.path.join(path, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        self._rotate()
+
+    def _rotate(self):
+        for old in self._ids()[self.max_traces:]:
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+
+    # ---- stored traces ----
+    def _ids(self):
+        """Stored profile ids, newest first"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted((n for n in names if _PROFILE_ID.fullmatch(n)), reverse=True)
+
+    def list(self, limit=50):
+        profiles = []
+        for profile_id in self._ids()[:limit]:
+            summary = self.summary(profile_id)
+            if summary is not None:
+                profiles.append({
+                    key: summary.get(key)
+                    for key in ("profile_id", "created_at", "duration_ms", "endpoint",
+                                "http_status", "image_bytes", "pid")
+                })
+        return profiles
+
+    def file_path(self, profile_id, name):
+        """Path of one stored trace file, or None (also for unknown names)"""
+        if name not in TRACE_FILES or not _PROFILE_ID.fullmatch(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id, name)
+        return path if os.path.isfile(path) else None
+
+    def summary(self, profile_id):
+        path = self.file_path(profile_id, "summary.json")
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "header": self.header,
+            "token_required": self.token is not None,
+            "profiled": self.profiled,
+            "skipped_busy": self.skipped_busy,
+            "stored": len(self._ids()),
+            "max_traces": self.max_traces,
+        }
@@ -0,0 +1,154 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+
+# -------------------------------------------------
+# Content-Addressed Analysis Result Cache
+# -------------------------------------------------
+def normalize_text(text):
+    """Case- and whitespace-insensitive form of a description"""
+    return " ".join(text.lower().split())
+
+
+def perceptual_hash(bgr, hash_size=8):
+    """
+    64-bit difference hash (dHash) of an already decoded BGR image.
+    Survives re-encoding, resizing and mild compression, so a re-saved
+    JPEG of the same photo hashes the same.
+    """
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+    pixels = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA).ravel().tolist()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class ResultCache:
+    """
+    Bounded LRU + TTL cache of analysis responses keyed by
+    sha256(image bytes) + normalized description.
+
+    With `use_phash`, an exact miss falls back to any entry with the same
+    description whose perceptual hash is within `phash_distance` bits.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600,
+                 use_phash=True, phash_distance=4):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.use_phash = use_phash
+        self.phash_distance = phash_distance
+
+        self._entries = OrderedDict()   # key -> (expires_at, phash, value)
+        self._by_text = {}              # normalized text -> {key: phash}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.phash_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def make_key(self, image_bytes, text):
+        """Returns (key, normalized_text) for a submission"""
+        norm_text = normalize_text(text)
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{digest}:{norm_text}", norm_text
+
+    def get(self, key, norm_text, phash_fn=None):
+        """
+        Cached value for `key`, else for a near-duplicate image with the
+        same description. `phash_fn()` returns the submission's perceptual
+        hash (or None); it is only called on an exact miss when some entry
+        shares the description.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                self._remove(key, norm_text)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                return self._hit(key, entry)
+            try_similar = self.use_phash and phash_fn is not None and norm_text in self._by_text
+
+        # Hashing needs the decoded image: do it outside the lock
+        phash = phash_fn() if try_similar else None
+        with self._lock:
+            if phash is not None:
+                key = self._find_similar(norm_text, phash, now)
+                entry = self._entries.get(key) if key else None
+                if entry is not None:
+                    self.phash_hits += 1
+                    return self._hit(key, entry)
+            self.misses += 1
+            return None
+
+    def put(self, key, norm_text, value, phash=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, norm_text)
+            self._entries[key] = (
+                time.monotonic() + self.ttl_seconds, phash, copy.deepcopy(value)
+            )
+            self._by_text.setdefault(norm_text, {})[key] = phash
+
+            while len(self._entries) > self.max_entries:
+                old_key = next(iter(self._entries))
+                self._remove(old_key, old_key.split(":", 1)[1])
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "phash_hits": self.phash_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    # ---- internals (call with lock held) ----
+    def _hit(self, key, entry):
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[2])
+
+    def _remove(self, key, norm_text):
+        self._entries.pop(key, None)
+        siblings = self._by_text.get(norm_text)
+        if siblings is not None:
+            siblings.pop(key, None)
+            if not siblings:
+                del self._by_text[norm_text]
+
+    def _find_similar(self, norm_text, phash, now):
+        for key, other in list(self._by_text.get(norm_text, {}).items()):
+            if other is None or bin(phash ^ other).count("1") > self.phash_distance:
+                continue
+            if self._entries[key][0] < now:
+                self._remove(key, norm_text)
+                self.expirations += 1
+                continue
+            return key
+        return None
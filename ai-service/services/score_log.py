@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:   # Windows: single-process use only
+    fcntl = None
+
+
+# -------------------------------------------------
+# Columnar Score Log
+# -------------------------------------------------
+# Layout of a log directory:
+#   schema.json   column dtypes/shapes + free-form metadata (labels, config)
+#   header.i64    [capacity, count]
+#   <column>.bin  one raw memory-mapped array per column
+_CAPACITY, _COUNT = 0, 1
+
+
+class ScoreLog:
+    """
+    Append-only, fixed-width columnar log backed by memory-mapped numpy
+    files; one row per analysed report.
+
+    Appends take an flock, so every gunicorn worker can share one log.
+    Files grow by `chunk_rows` at a time. Readers use ScoreLog.load(),
+    which maps the columns read-only without copying them.
+
+    If the directory already holds a log with a different schema or
+    metadata (e.g. new thresholds), it is renamed aside and a fresh log is
+    started, so each log is internally consistent.
+    """
+
+    def __init__(self, path, columns, metadata=None, chunk_rows=65536):
+        self.path = path
+        self.columns = {name: (np.dtype(dtype), tuple(shape)) for name, (dtype, shape) in columns.items()}
+        self.metadata = metadata or {}
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        self._arrays = {}
+        self._mapped_capacity = 0
+
+        os.makedirs(path, exist_ok=True)
+        schema = {
+            "columns": {name: [dtype.str, list(shape)] for name, (dtype, shape) in self.columns.items()},
+            "metadata": self.metadata,
+        }
+        with self._file_lock():
+            schema_path = os.path.join(path, "schema.json")
+            if os.path.exists(schema_path):
+                with open(schema_path) as f:
+                    existing = json.load(f)
+                if existing != schema:
+                    self._rotate()
+            if not os.path.exists(schema_path):
+                with open(schema_path, "w") as f:
+                    json.dump(schema, f, indent=2)
+                header = np.memmap(self._file("header.i64"), np.int64, "w+", shape=(2,))
+                header.flush()
+            self._header = np.memmap(self._file("header.i64"), np.int64, "r+", shape=(2,))
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _rotate(self):
+        # Move the old log's files into a sibling directory
+        archive = f"{self.path.rstrip(os.sep)}.{time.strftime('%Y%m%d-%H%M%S')}"
+        os.makedirs(archive)
+        for name in os.listdir(self.path):
+            if name != "log.lock":
+                os.replace(self._file(name), os.path.join(archive, name))
+        print(f"Score log schema changed; previous log moved to {archive}")
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._file("log.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _map(self, capacity):
+        """(Re)map every column file at `capacity` rows, growing files as needed"""
+        for name, (dtype, shape) in self.columns.items():
+            path = self._file(f"{name}.bin")
+            size = capacity * dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            with open(path, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self._arrays[name] = np.memmap(path, dtype, "r+", shape=(capacity,) + shape)
+        self._mapped_capacity = capacity
+
+    @property
+    def count(self):
+        return int(self._header[_COUNT])
+
+    def append(self, row):
+        """Append one row (dict of column -> value; missing columns stay zero)"""
+        with self._lock, self._file_lock():
+            count, capacity = int(self._header[_COUNT]), int(self._header[_CAPACITY])
+            if count >= capacity:
+                capacity += self.chunk_rows
+                self._map(capacity)
+                self._header[_CAPACITY] = capacity
+            elif self._mapped_capacity != capacity:
+                self._map(capacity)   # grown by another process
+            for name, value in row.items():
+                self._arrays[name][count] = value
+            # Publish the row only after it is fully written
+            self._header[_COUNT] = count + 1
+
+    def flush(self):
+        for array in self._arrays.values():
+            array.flush()
+        self._header.flush()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "rows": self.count,
+            "bytes_per_row": sum(
+                dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+                for dtype, shape in self.columns.values()
+            ),
+        }
+
+    @staticmethod
+    def load(path):
+        """(columns, metadata): read-only memmaps of every column, `count` rows long"""
+        with open(os.path.join(path, "schema.json")) as f:
+            schema = json.load(f)
+        header = np.fromfile(os.path.join(path, "header.i64"), np.int64, count=2)
+        count = int(header[_COUNT])
+        columns = {}
+        for name, (dtype, shape) in schema["columns"].items():
+            shape = (count,) + tuple(shape)
+            if count == 0:
+                columns[name] = np.zeros(shape, dtype)
+            else:
+                columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), np.dtype(dtype), "r", shape=shape)
+        return columns, schema["metadata"]
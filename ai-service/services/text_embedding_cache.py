@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+
+from services.result_cache import normalize_text
+
+
+# -------------------------------------------------
+# CLIP Text Embedding Cache
+# -------------------------------------------------
+class TextEmbeddingCache:
+    """
+    Bounded LRU cache of normalized CLIP text embeddings keyed by the
+    case- and whitespace-normalized description.
+
+    Bounded both by entry count and by `max_bytes` of embedding storage
+    (plus the key strings); whichever limit is hit first evicts the least
+    recently used entries. Embeddings must not change for the lifetime of
+    the cache, so clear() it when the model is reloaded.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()   # normalized text -> (embedding, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def key(text):
+        return normalize_text(text)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, embedding):
+        if not self.enabled:
+            return
+        # Own copy: batcher results are views into the whole batch's tensor
+        embedding = embedding.detach().clone()
+        nbytes = embedding.numel() * embedding.element_size() + len(key)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (embedding, nbytes)
+            self._bytes += nbytes
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
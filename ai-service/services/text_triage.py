@@ -0,0 +1,187 @@
+import re
+
+import numpy as np
+
+
+# -------------------------------------------------
+# Single-Pass Keyword Matcher
+# -------------------------------------------------
+class TextHits:
+    """Keywords found in one description, queryable per keyword group"""
+
+    __slots__ = ("keywords", "_groups")
+
+    def __init__(self, keywords, groups):
+        self.keywords = keywords
+        self._groups = groups
+
+    def group(self, name):
+        """Matched keywords of a group, in the group's declared order"""
+        return [k for k in self._groups[name] if k in self.keywords]
+
+    def any(self, name):
+        return any(k in self.keywords for k in self._groups[name])
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword of every group in ONE scan of the lowercased text,
+    with the same substring semantics as `keyword in text.lower()`.
+
+    All keywords are compiled into a single alternation inside a lookahead,
+    longest first, so the regex engine reports the longest keyword starting
+    at each position. Shorter keywords contained in a match ("spark" inside
+    "sparking", "wire" inside "live wire") are added from a precomputed
+    containment table, so overlapping hits are never lost.
+    """
+
+    def __init__(self, groups):
+        self.groups = {name: list(words) for name, words in groups.items()}
+        keywords = sorted(
+            {k.lower() for words in self.groups.values() for k in words},
+            key=lambda k: (-len(k), k)
+        )
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(k) for k in keywords) + "))"
+        )
+        self._contained = {
+            k: frozenset(other for other in keywords if other in k)
+            for k in keywords
+        }
+
+    def scan(self, text):
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            found |= self._contained[match.group(1)]
+        return TextHits(found, self.groups)
+
+
+# -------------------------------------------------
+# Lexicon Urgency Scorer
+# -------------------------------------------------
+_QUOTES_RE = re.compile("['\"\u2018\u2019\u201c\u201d]")
+
+
+class LexiconUrgencyScorer:
+    """
+    Lighter stand-in for abs(TextBlob(text).sentiment.polarity) that scores
+    many texts at once.
+
+    Walks the same pattern lexicon with TextBlob's rules, without building
+    a TextBlob: a known adverb ("very") scales the polarity of the next
+    known word by its intensity and merges with it, a negation before a
+    word scales it by -0.5, and "!" boosts the preceding assessment by
+    1.25. Emoticons and the sarcasm mark "(!)" are scored as TextBlob does.
+    """
+
+    def __init__(self):
+        from textblob import _text as pattern
+        from textblob.en import sentiment as pattern_lexicon
+
+        self.negations = frozenset(pattern_lexicon.negations)
+        self.lexicon = {}   # word -> (polarity, intensity, is_modifier)
+        for word, senses in pattern_lexicon.items():
+            polarity, _, intensity = senses[None]
+            self.lexicon[word] = (
+                polarity, intensity,
+                any(tag in senses for tag in pattern_lexicon.modifiers)
+            )
+        self.emoticons = {"(!)": 0.0}   # sarcasm mark
+        for (_, polarity), faces in pattern.EMOTICONS.items():
+            self.emoticons.update(
+                (face.lower(), polarity) for face in faces if not face.isalpha()
+            )
+        self._pattern = pattern
+        # TextBlob splits contractions ("isn't" -> "is n't") and then every
+        # apostrophe, so "n't" never reaches the lexicon as a word
+        self._contraction = re.compile("|".join(map(re.escape, pattern.replacements)))
+
+    def score(self, text):
+        return float(self.score_batch([text])[0])
+
+    def score_batch(self, texts):
+        """abs(mean polarity) per text as a float32 array"""
+        return np.fromiter(
+            (abs(self._polarity(self._tokens(text))) for text in texts),
+            dtype=np.float32, count=len(texts)
+        )
+
+    def _is_abbreviation(self, token):
+        pattern = self._pattern
+        return token in pattern.ABBREVIATIONS or any(
+            regex.match(token) for regex in (pattern.RE_ABBR1, pattern.RE_ABBR2, pattern.RE_ABBR3)
+        )
+
+    def _tokens(self, text):
+        """TextBlob's tokenization (find_tokens), lowercased"""
+        punctuation = self._pattern.PUNCTUATION.replace(".", "")
+        text = self._contraction.sub(lambda m: " " + m.group(), text)
+        text = _QUOTES_RE.sub(lambda m: f" {m.group()} ", text)
+        tokens = []
+        for token in text.split():
+            # Split leading and trailing punctuation, "..." and a final
+            # period that does not end an abbreviation
+            while token and token[0] in punctuation:
+                tokens.append(token[0])
+                token = token[1:]
+            tail = []
+            while token and token[-1] in self._pattern.PUNCTUATION:
+                if token[-1] in punctuation:
+                    tail.append(token[-1])
+                    token = token[:-1]
+                if token.endswith("..."):
+                    tail.append("...")
+                    token = token[:-3].rstrip(".")
+                if token.endswith("."):
+                    if self._is_abbreviation(token):
+                        break
+                    tail.append(".")
+                    token = token[:-1]
+            if token:
+                tokens.append(token)
+            tokens.extend(reversed(tail))
+        
+        text = self._pattern.RE_SARCASM.sub("(!)", " ".join(tokens))
+        text = self._pattern.RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), text)
+        return text.lower().split()
+
+    def _polarity(self, tokens):
+        assessments = []   # [polarity, intensity, negated]
+        modifier = None    # preceding known adverb
+        negated = False    # preceding negation
+        for word in tokens:
+            entry = self.lexicon.get(word)
+            if entry is not None:
+                polarity, intensity, is_modifier = entry
+                if modifier is None:
+                    assessments.append([polarity, intensity, False])
+                else:
+                    # "very dangerous": one assessment, scaled by "very"
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[1], 1.0))
+                    last[1] = intensity
+                if negated:
+                    assessments[-1][1] = 1.0 / assessments[-1][1]
+                    assessments[-1][2] = True
+                modifier = word if is_modifier else None
+                negated = word in self.negations
+                continue
+            
+            if word in self.negations:
+                negated = True
+            elif negated and len(word) > 1:
+                negated = False   # a negation carries over one-letter words only
+            if negated and modifier is not None and modifier.endswith("ly"):
+                # "really not good"
+                assessments[-1][2] = True
+                negated = False
+            elif modifier is not None and len(word) > 2:
+                modifier = None   # a modifier carries over short words only
+            if word == "!" and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+            elif word in self.emoticons:
+                assessments.append([self.emoticons[word], 1.0, False])
+        
+        if not assessments:
+            return 0.0
+        return sum(p * -0.5 if neg else p for p, _, neg in assessments) / len(assessments)
@@ -0,0 +1,53 @@
+from textblob import TextBlob
+
+from services.text_triage import LexiconUrgencyScorer
+
+# Report descriptions in the style citizens write them, plus the cases
+# TextBlob treats specially: intensifiers, negations, "!", contractions,
+# abbreviations, emoticons and the sarcasm mark.
+SAMPLE_DESCRIPTIONS = [
+    "Huge pothole on the road, very dangerous!",
+    "Large pothole in the middle of the road near the bus stop",
+    "Garbage dump overflowing on the street, bad smell and litter everywhere",
+    "Water leakage from a broken pipe flooding the footpath",
+    "Street light not working for two weeks, the lane is completely dark at night",
+    "Sparking electrical wires hanging from a damaged transformer on a pole.",
+    "A large building fire with heavy black smoke in a city street.",
+    "Really terrible drainage, sewage water everywhere!!",
+    "The road isn't safe, it's extremely slippery after the rain",
+    "Not a big problem but the bench is broken",
+    "really not good, the footpath tiles are loose",
+    "Fallen tree blocking the whole road. Urgent!!! Cars can't pass",
+    "Stray dogs near the school gate, kids are scared :(",
+    "Thanks for fixing the light so quickly :)",
+    "Great job (!) the pothole is back after one week",
+    "Open manhole on MG Rd. etc. very very risky for two-wheelers",
+    "Traffic signal stuck on red since morning, huge jam",
+    "Illegal dumping of construction debris on the lake shore",
+    "Water supply contaminated, smells awful and looks muddy",
+    "Broken railing on the flyover, someone could fall",
+    "",
+    "!!!",
+    "pothole",
+]
+
+
+def test_lexicon_urgency_matches_textblob():
+    scorer = LexiconUrgencyScorer()
+    scores = scorer.score_batch(SAMPLE_DESCRIPTIONS)
+    for text, score in zip(SAMPLE_DESCRIPTIONS, scores):
+        expected = abs(TextBlob(text).sentiment.polarity)
+        assert abs(float(score) - expected) < 1e-5, (text, float(score), expected)
+
+
+def test_lexicon_urgency_single_matches_batch():
+    scorer = LexiconUrgencyScorer()
+    scores = scorer.score_batch(SAMPLE_DESCRIPTIONS)
+    for text, score in zip(SAMPLE_DESCRIPTIONS, scores):
+        assert scorer.score(text) == float(score)
+
+
+if __name__ == "__main__":
+    test_lexicon_urgency_matches_textblob()
+    test_lexicon_urgency_single_matches_batch()
+    print("✅ Lexicon urgency scores match TextBlob")
@@ -0,0 +1,179 @@
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+# -------------------------------------------------
+# Single-Decode Image Pipeline
+# -------------------------------------------------
+# cv2 can decode JPEGs at 1/2, 1/4 or 1/8 scale straight from the DCT
+# coefficients; for other formats it decodes and then downsizes.
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Smallest sizes the models need: YOLO letterboxes the long side to 640,
+# CLIP resizes the short side to 224.
+YOLO_MIN_LONG_SIDE = 640
+CLIP_MIN_SHORT_SIDE = 224
+
+
+class DecodedImage:
+    """
+    One decoded BGR buffer shared by every model stage.
+
+    `bgr` is what YOLO/OpenCV expect; `rgb` is a zero-copy channel-reversed
+    view of the same memory for CLIP.
+    """
+
+    __slots__ = ("bgr", "format", "original_size", "scale")
+
+    def __init__(self, bgr, image_format, original_size, scale):
+        self.bgr = bgr
+        self.format = image_format
+        self.original_size = original_size    # (width, height) in the file
+        self.scale = scale                    # decode reduction factor
+
+    @property
+    def rgb(self):
+        return self.bgr[..., ::-1]
+
+    @property
+    def size(self):
+        height, width = self.bgr.shape[:2]
+        return width, height
+
+
+def read_image_header(image_bytes):
+    """
+    Return (format, (width, height)) from the header only - PIL does not
+    decode pixel data until asked. Returns (None, None) if unreadable.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as header:
+            return header.format, header.size
+    except Exception:
+        return None, None
+
+
+def pick_reduction(size, min_long_side=YOLO_MIN_LONG_SIDE,
+                   min_short_side=CLIP_MIN_SHORT_SIDE):
+    """Largest 1/2/4/8 reduction that keeps both model inputs full quality"""
+    if size is None or min_long_side <= 0:
+        return 1
+    long_side, short_side = max(size), min(size)
+    for factor in (8, 4, 2):
+        if long_side // factor >= min_long_side and short_side // factor >= min_short_side:
+            return factor
+    return 1
+
+
+def decode_image(image_bytes, min_long_side=YOLO_MIN_LONG_SIDE,
+                 min_short_side=CLIP_MIN_SHORT_SIDE):
+    """
+    Decode an upload once, at the smallest resolution both models can use
+    without losing input detail. Pass min_long_side=0 for a full-resolution
+    decode. Returns a DecodedImage, or None if the bytes are not an image.
+    """
+    image_format, size = read_image_header(image_bytes)
+    factor = pick_reduction(size, min_long_side, min_short_side)
+
+    np_img = np.frombuffer(image_bytes, np.uint8)
+    bgr = cv2.imdecode(np_img, _REDUCED_FLAGS[factor])
+    if bgr is None:
+        return None
+    return DecodedImage(bgr, image_format, size, factor)
+
+
+# -------------------------------------------------
+# Bounded Upload Reading
+# -------------------------------------------------
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Give up on identifying the format after this many bytes (JPEG EXIF
+# blocks can push the frame header past the first chunk)
+HEADER_SNIFF_LIMIT = 256 * 1024
+
+
+class UploadRejected(Exception):
+    """An upload refused before decoding; reason_code labels the metric"""
+
+    def __init__(self, reason_code, message, status_code=400):
+        super().__init__(message)
+        self.reason_code = reason_code
+        self.message = message
+        self.status_code = status_code
+
+
+class UploadReader:
+    """
+    Accumulates an upload chunk by chunk and rejects it as soon as the
+    bytes seen so far show it is too large, not a supported image format,
+    or has more pixels than allowed. Format and dimensions come from the
+    header (PIL parses it without decoding pixels), so nothing oversized
+    is ever fully read or decoded.
+    """
+
+    def __init__(self, max_bytes, max_pixels, formats):
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.formats = formats
+        self.format = None
+        self.size = None
+        self._buffer = bytearray()
+
+    def _sniff(self):
+        try:
+            with Image.open(io.BytesIO(bytes(self._buffer[:HEADER_SNIFF_LIMIT]))) as header:
+                self.format, self.size = header.format, header.size
+        except Image.DecompressionBombError:
+            raise UploadRejected("too_many_pixels", "Image resolution is too large")
+        except Exception:
+            return   # header incomplete (or not an image): need more bytes
+
+        if self.format not in self.formats:
+            raise UploadRejected(
+                "unsupported_image",
+                f"Unsupported image format {self.format} "
+                f"(allowed: {', '.join(sorted(self.formats))})"
+            )
+        width, height = self.size
+        if self.max_pixels and width * height > self.max_pixels:
+            raise UploadRejected(
+                "too_many_pixels",
+                f"Image resolution is too large ({width}x{height}, "
+                f"max {self.max_pixels // 1_000_000} megapixels)"
+            )
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        if self.max_bytes and len(self._buffer) > self.max_bytes:
+            raise UploadRejected(
+                "upload_too_large",
+                f"Image file is too large (max {self.max_bytes // (1024 * 1024)} MB)",
+                413
+            )
+        if self.format is None and len(self._buffer) - len(chunk) < HEADER_SNIFF_LIMIT:
+            self._sniff()
+            if self.format is None and len(self._buffer) >= HEADER_SNIFF_LIMIT:
+                raise UploadRejected("unsupported_image", "Invalid image file")
+
+    def finish(self):
+        """The complete upload, once it has passed every check"""
+        if self.format is None:
+            raise UploadRejected("unsupported_image", "Invalid image file")
+        return bytes(self._buffer)
+
+
+def read_upload(stream, max_bytes, max_pixels, formats):
+    """Read a file-like upload with UploadReader; raises UploadRejected"""
+    reader = UploadReader(max_bytes, max_pixels, formats)
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return reader.finish()
+        reader.feed(chunk)